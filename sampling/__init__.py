@@ -1,3 +1,6 @@
 __version__ = "0.0.1"
 from sampling.urns import Urn
 from sampling.utils import sample
+from sampling.parallel import sample_parallel
+from sampling.grouped import sample_grouped
+from sampling.threaded import LockedUrn, PrefetchingUrn
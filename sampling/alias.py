@@ -0,0 +1,111 @@
+from sampling.lazy import np
+
+
+class AliasTable:
+    """Walker's alias method, built with Vose's algorithm.
+
+    Building the table is O(n), after which every query is O(1). The table is rebuilt
+    lazily on the next query after the weights have been changed, so it is best suited
+    for static distributions that are sampled from many times.
+
+    Unlike the cumulative sum structures, `query` does not invert the cumulative
+    distribution. It maps a search weight drawn uniformly from [0, get_sum()] to an
+    index drawn with probability proportional to its weight.
+    """
+
+    # Every change triggers an O(n) rebuild
+    dynamic = False
+
+    def __init__(self, weights):
+        self.weights = np.array(weights, dtype=float)
+        assert np.all(self.weights >= 0)
+        self._stale = True
+
+    def _build(self):
+        n = len(self.weights)
+        self._sum = np.sum(self.weights)
+        scaled = self.weights * (n / self._sum)
+        probabilities = [1.0] * n
+        aliases = list(range(n))
+
+        # Classify with NumPy, and pair with Python lists, never indexing the array element by element
+        small = np.flatnonzero(scaled < 1).tolist()
+        large = np.flatnonzero(scaled >= 1).tolist()
+        scaled = scaled.tolist()
+
+        # Pair every underfull column with an overfull one, which fills it up
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # What remains is full, up to rounding errors
+        self._probabilities = np.array(probabilities)
+        self._aliases = np.array(aliases, dtype=np.intp)
+        self._stale = False
+
+    def __len__(self):
+        return len(self.weights)
+
+    def get_sum(self):
+        if self._stale:
+            self._build()
+        return self._sum
+
+    def query(self, search_weight):
+        total = self.get_sum()
+        assert 0 <= search_weight <= total
+
+        # Split the uniform into a column and a biased coin flip within the column
+        n = len(self.weights)
+        column = search_weight / total * n
+        index = min(int(column), n - 1)
+        if column - index < self._probabilities[index]:
+            return index
+        return int(self._aliases[index])
+
+    def query_many(self, search_weights):
+        search_weights = np.asarray(search_weights)
+        total = self.get_sum()
+        assert np.all((0 <= search_weights) & (search_weights <= total))
+
+        n = len(self.weights)
+        columns = search_weights / total * n
+        indices = np.minimum(columns.astype(np.intp), n - 1)
+        accept = (columns - indices) < self._probabilities[indices]
+        return np.where(accept, indices, self._aliases[indices])
+
+    def update_weight(self, index, weight):
+        self.weights[index] = weight
+        self._stale = True
+
+    def update_weights(self, indices, weights):
+        self.weights[indices] = weights
+        self._stale = True
+
+    def __getitem__(self, index):
+        return self.weights[index]
+
+    def remove(self, index):
+        """Remove the weight at `index` by moving the last weight into its slot."""
+        self.weights[index] = self.weights[-1]
+        self.weights = self.weights[:-1]
+        self._stale = True
+
+    def remove_many(self, indices):
+        """Remove the weights at `indices`, given in decreasing order, as if calling `remove` on each."""
+        last = len(self.weights) - 1
+        for index in indices:
+            self.weights[index] = self.weights[last]
+            last -= 1
+        self.weights = self.weights[: last + 1]
+        self._stale = True
+
+    def extend(self, weights):
+        self.weights = np.append(self.weights, weights)
+        self._stale = True
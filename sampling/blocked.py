@@ -0,0 +1,103 @@
+from sampling.lazy import is_numpy_instance, np
+
+
+def _dump_array(array):
+    """Refer to a memory map by its file when pickling, instead of copying its data."""
+    if is_numpy_instance(array, "memmap") and array.filename is not None:
+        return ("memmap", array.filename, array.offset, array.dtype.str, array.shape)
+    return array
+
+
+def _load_array(dumped):
+    if isinstance(dumped, tuple) and dumped[0] == "memmap":
+        _, filename, offset, dtype, shape = dumped
+        return np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=shape)
+    return dumped
+
+
+class BlockedCumulativeSum:
+    """Cumulative sums over weights which do not fit in memory, such as a memory-mapped array.
+
+    The weights are split into blocks, and only the sum of every block is kept in memory,
+    along with a cumulative sum over the block sums. A query finds the block first, then
+    reads that block alone, so queries and updates cost O(n / block_size + block_size)
+    and read O(block_size) weights. The weights themselves are never written to; updated
+    weights are kept in memory as overrides.
+
+    Queries search to the right, returning the index i with cumsum[i - 1] <= w < cumsum[i],
+    so weights set to zero are never returned.
+    """
+
+    def __init__(self, weights, block_size=2 ** 16):
+        if block_size < 1:
+            raise ValueError("'block_size' must be a positive integer")
+        self.weights = weights
+        self.block_size = block_size
+        self._overrides = dict()  # Maps a block to a dict from index to weight
+
+        num_blocks = -(-len(weights) // block_size)
+        self.block_sums = np.zeros(num_blocks)
+        for block in range(num_blocks):
+            block_weights = self._block(block)
+            assert np.all(block_weights >= 0)
+            self.block_sums[block] = np.sum(block_weights)
+        self.cumulative_block_sums = np.cumsum(self.block_sums)
+
+    def __getstate__(self):
+        return {**self.__dict__, "weights": _dump_array(self.weights)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, weights=_load_array(state["weights"]))
+
+    def _block(self, block):
+        """Read the weights of a block into memory, with overrides applied."""
+        start = block * self.block_size
+        block_weights = np.array(self.weights[start : start + self.block_size], dtype=float)
+        for index, weight in self._overrides.get(block, dict()).items():
+            block_weights[index - start] = weight
+        return block_weights
+
+    def __len__(self):
+        return len(self.weights)
+
+    def get_sum(self):
+        return float(self.cumulative_block_sums[-1]) if len(self.cumulative_block_sums) else 0.0
+
+    def query(self, search_weight):
+        assert 0 <= search_weight <= self.get_sum()
+        return int(self.query_many([search_weight])[0])
+
+    def query_many(self, search_weights):
+        search_weights = np.asarray(search_weights, dtype=float)
+        assert np.all((0 <= search_weights) & (search_weights <= self.get_sum()))
+
+        # Never step past the last block with a positive sum, as could happen when w = get_sum()
+        last_block = np.flatnonzero(self.block_sums)[-1]
+        blocks = np.minimum(np.searchsorted(self.cumulative_block_sums, search_weights, side="right"), last_block)
+        indices = np.empty(len(search_weights), dtype=np.intp)
+
+        # Read every block once, however many queries end up in it
+        for block in np.unique(blocks).tolist():
+            in_block = blocks == block
+            offset = self.cumulative_block_sums[block - 1] if block > 0 else 0
+            cumulative_weights = np.cumsum(self._block(block))
+            within = np.searchsorted(cumulative_weights, search_weights[in_block] - offset, side="right")
+            within = np.minimum(within, np.flatnonzero(cumulative_weights == cumulative_weights[-1])[0])
+            indices[in_block] = block * self.block_size + within
+
+        return indices
+
+    def __getitem__(self, index):
+        return self._overrides.get(index // self.block_size, dict()).get(index, self.weights[index])
+
+    def update_weight(self, index, weight):
+        self.update_weights([index], [weight])
+
+    def update_weights(self, indices, weights):
+        """Set the weights at `indices`, rereading every affected block once."""
+        for index, weight in zip(np.asarray(indices).tolist(), np.asarray(weights, dtype=float).tolist()):
+            self._overrides.setdefault(index // self.block_size, dict())[index] = weight
+
+        for block in np.unique(np.asarray(indices) // self.block_size).tolist():
+            self.block_sums[block] = np.sum(self._block(block))
+        self.cumulative_block_sums = np.cumsum(self.block_sums)
@@ -0,0 +1,144 @@
+import math
+from sampling.lazy import np
+from sampling.rng import make_rng
+
+
+class BucketedWeights:
+    """Weights grouped in buckets by their power of two, with expected O(1) queries and changes.
+
+    A weight w in [2^(b-1), 2^b) is put in bucket b. A query picks a bucket with
+    probability proportional to its sum, then an element within the bucket by rejection
+    sampling against the upper bound 2^b of the bucket. Every attempt is accepted with
+    probability at least 1/2. Changes move a single element between buckets.
+
+    The costs are O(1) in the number of weights, but a query visits every bucket, and
+    there is one bucket per power of two spanned by the weights.
+
+    Unlike the cumulative sum structures, `query` does not invert the cumulative
+    distribution. It maps a search weight drawn uniformly from [0, get_sum()] to an
+    index drawn with probability proportional to its weight, drawing more random
+    numbers from `rng` when an attempt is rejected.
+    """
+
+    # Changes cost O(1)
+    dynamic = True
+    # Queries draw random numbers of their own
+    randomized = True
+
+    def __init__(self, weights, rng=None):
+        self.rng = make_rng(rng)
+        self._weights = []
+        self._buckets = dict()  # Maps a bucket to a list of indices
+        self._bucket_sums = dict()
+        self._positions = []  # Maps an index to its position in the list of its bucket
+        self._sum = 0.0
+        self.extend(weights)
+
+    @staticmethod
+    def _bucket(weight):
+        return math.frexp(weight)[1]
+
+    def _attach(self, index, weight):
+        self._weights[index] = weight
+        if weight == 0:
+            self._positions[index] = None
+            return
+        bucket = self._bucket(weight)
+        indices = self._buckets.setdefault(bucket, [])
+        self._positions[index] = len(indices)
+        indices.append(index)
+        self._bucket_sums[bucket] = self._bucket_sums.get(bucket, 0.0) + weight
+        self._sum += weight
+
+    def _detach(self, index):
+        weight = self._weights[index]
+        if weight == 0:
+            return
+        bucket = self._bucket(weight)
+        indices = self._buckets[bucket]
+
+        # Move the last index of the bucket into the position of the detached index
+        last = indices.pop()
+        if last != index:
+            position = self._positions[index]
+            indices[position] = last
+            self._positions[last] = position
+
+        if indices:
+            self._bucket_sums[bucket] -= weight
+            self._sum -= weight
+        else:
+            # Start over from exact sums, so that rounding errors do not accumulate
+            del self._buckets[bucket], self._bucket_sums[bucket]
+            self._sum = math.fsum(self._bucket_sums.values())
+
+    def __len__(self):
+        return len(self._weights)
+
+    @property
+    def weights(self):
+        return np.array(self._weights)
+
+    def get_sum(self):
+        return self._sum
+
+    def query(self, search_weight):
+        assert 0 <= search_weight <= self.get_sum() * (1 + 1e-9)
+        if not self._bucket_sums:
+            # Every weight is zero, so any index will do
+            return 0
+
+        # Pick a bucket, keeping the remainder as a uniform number for the first attempt
+        for bucket, bucket_sum in self._bucket_sums.items():
+            if search_weight < bucket_sum:
+                break
+            search_weight -= bucket_sum
+        uniform = min(search_weight / bucket_sum, 1.0)
+
+        indices = self._buckets[bucket]
+        upper_bound = 2.0 ** bucket
+        while True:
+            scaled = uniform * len(indices)
+            position = min(int(scaled), len(indices) - 1)
+            index = indices[position]
+            if (scaled - position) * upper_bound < self._weights[index]:
+                return index
+            uniform = self.rng.random()
+
+    def query_many(self, search_weights):
+        return np.array([self.query(search_weight) for search_weight in np.asarray(search_weights).tolist()])
+
+    def update_weight(self, index, weight):
+        assert weight >= 0
+        self._detach(index)
+        self._attach(index, float(weight))
+
+    def update_weights(self, indices, weights):
+        for index, weight in zip(np.asarray(indices).tolist(), np.asarray(weights, dtype=float).tolist()):
+            self.update_weight(index, weight)
+
+    def __getitem__(self, index):
+        return self._weights[index]
+
+    def remove(self, index):
+        """Remove the weight at `index` by moving the last weight into its slot."""
+        last = len(self._weights) - 1
+        self._detach(index)
+        if index != last:
+            weight = self._weights[last]
+            self._detach(last)
+            self._attach(index, weight)
+        self._weights.pop()
+        self._positions.pop()
+
+    def remove_many(self, indices):
+        """Remove the weights at `indices`, given in decreasing order, as if calling `remove` on each."""
+        for index in indices:
+            self.remove(index)
+
+    def extend(self, weights):
+        for weight in np.asarray(weights, dtype=float).tolist():
+            assert weight >= 0
+            self._weights.append(weight)
+            self._positions.append(None)
+            self._attach(len(self._weights) - 1, weight)
@@ -6,15 +6,24 @@ Created on Sun Mar  8 14:40:33 2020
 @author: tommy
 """
 
-import numpy as np
+from sampling.lazy import np
 
 
 class CumulativeSum:
+    # Every change recomputes the cumulative sum in O(n)
+    dynamic = False
+
     def __init__(self, weights):
-        self.weights = np.array(weights)
+        self.weights = np.array(weights, dtype=float)
         assert np.all(self.weights > 0)
+        self._build()
+
+    def _build(self):
         self.cumulative_weights = np.cumsum(self.weights)
 
+    def __len__(self):
+        return len(self.weights)
+
     def get_sum(self):
         return self.cumulative_weights[-1]
 
@@ -24,17 +33,39 @@ class CumulativeSum:
         index = np.searchsorted(self.cumulative_weights, search_weight, side="left", sorter=None)
         return index
 
+    def query_many(self, search_weights):
+        search_weights = np.asarray(search_weights)
+        assert np.all((0 <= search_weights) & (search_weights <= self.get_sum()))
+
+        return np.searchsorted(self.cumulative_weights, search_weights, side="left", sorter=None)
+
     def update_weight(self, index, weight):
         self.weights[index] = weight
-        self.cumulative_weights = np.cumsum(self.weights)
+        self._build()
+
+    def update_weights(self, indices, weights):
+        """Set the weights at `indices`, recomputing the cumulative sum once."""
+        self.weights[indices] = weights
+        self._build()
 
     def __getitem__(self, index):
         return self.weights[index]
 
     def remove(self, index):
-        self.weights = np.delete(self.weights, index)
-        self.cumulative_weights = np.cumsum(self.weights)
+        """Remove the weight at `index` by moving the last weight into its slot."""
+        self.weights[index] = self.weights[-1]
+        self.weights = self.weights[:-1]
+        self._build()
 
     def extend(self, weights):
         self.weights = np.append(self.weights, weights)
-        self.cumulative_weights = np.cumsum(self.weights)
+        self._build()
+
+    def remove_many(self, indices):
+        """Remove the weights at `indices`, given in decreasing order, as if calling `remove` on each."""
+        last = len(self.weights) - 1
+        for index in indices:
+            self.weights[index] = self.weights[last]
+            last -= 1
+        self.weights = self.weights[: last + 1]
+        self._build()
@@ -0,0 +1,135 @@
+"""
+Sampling from many groups (strata) at once.
+
+The elements are sorted by group once, after which every group is a contiguous
+segment, and all groups are sampled together with NumPy operations over the
+segments, instead of building an urn per group:
+
+- Without replacement, every element gets a key, E / w with E exponentially
+  distributed (uniform keys without weights). Sorting by group and key, the
+  first k_i elements of a segment are a sample of group i, in the order of
+  sequential draws.
+- With replacement, the weights of every group are normalized to sum to one, and a
+  single cumulative sum spans all the segments. A draw from group i inverts it within
+  the segment of the group, by a search over the whole cumulative sum of a uniform
+  scaled to the segment.
+"""
+
+from sampling.lazy import np
+from sampling.rng import make_rng
+
+
+def sample_grouped(population, group_ids, sizes, weights=None, replace=False, rng=None):
+    """
+    Draw samples from every group of a collection, in a single vectorized pass.
+
+    Parameters
+    ----------
+    population: array_like
+        The data points.
+
+    group_ids: array_like of int
+        The group of every data point, an integer in [0, number of groups). The data
+        points of a group need not be contiguous.
+
+    sizes: int or array_like of int
+        The number of samples from every group, or one number per group. Without
+        replacement, all of a group is returned if it has fewer data points.
+
+    weights: array_like
+        One weight per data point. If None is passed, uniform weights are used.
+
+    replace: bool
+        Sample with or without replacement.
+
+    rng: None, int or numpy.random.Generator
+        The source of random numbers. If None, the global state of the
+        `random` and `numpy.random` modules is used.
+
+    Returns
+    -------
+    (numpy.ndarray, numpy.ndarray)
+    Returns offsets, of length the number of groups plus one, and a flat array of
+    samples, where the samples from group i are samples[offsets[i]:offsets[i + 1]].
+
+    Examples
+    --------
+    >>> data = [1, 3, 4, 7, 8]
+    >>> group_ids = [0, 0, 1, 1, 1]
+    >>> offsets, samples = sample_grouped(data, group_ids, sizes=[1, 2])
+
+    """
+    rng = make_rng(rng)
+    population = np.asarray(population)
+    group_ids = np.asarray(group_ids, dtype=np.intp)
+    assert population.shape[:1] == group_ids.shape
+    assert np.all(group_ids >= 0)
+
+    if np.ndim(sizes) == 0:
+        num_groups = int(group_ids.max()) + 1 if len(group_ids) else 0
+        sizes = np.full(num_groups, sizes, dtype=np.intp)
+    sizes = np.asarray(sizes, dtype=np.intp)
+    num_groups = len(sizes)
+    assert np.all(sizes >= 0)
+    assert len(group_ids) == 0 or group_ids.max() < num_groups
+
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+        assert weights.shape == group_ids.shape
+        assert np.all(weights >= 0)
+
+    # Every group becomes the segment [starts[i], starts[i] + counts[i]) of the sorted elements
+    counts = np.bincount(group_ids, minlength=num_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.intp)
+
+    if replace:
+        if np.any((counts == 0) & (sizes > 0)):
+            raise ValueError("Cannot sample with replacement from an empty group")
+        order = np.argsort(group_ids, kind="stable")
+        sorted_weights = None if weights is None else weights[order]
+        indices = _grouped_indices_with_replacement(starts, counts, sizes, sorted_weights, rng)
+        offsets = np.concatenate([[0], np.cumsum(sizes)])
+        return offsets, population[order[indices]]
+
+    if weights is None:
+        keys = rng.random_array(len(group_ids))
+    else:
+        with np.errstate(divide="ignore"):
+            keys = rng.standard_exponential(len(group_ids)) / weights
+    # Sorting by key, then stably by group, is faster than a lexicographic sort
+    order = np.argsort(keys)
+    order = order[np.argsort(group_ids[order], kind="stable")]
+
+    # Keep the first min(k_i, n_i) elements of every segment
+    taken = np.minimum(sizes, counts)
+    ranks = np.arange(len(order)) - np.repeat(starts, counts)
+    offsets = np.concatenate([[0], np.cumsum(taken)])
+    return offsets, population[order[ranks < np.repeat(taken, counts)]]
+
+
+def _grouped_indices_with_replacement(starts, counts, sizes, weights, rng):
+    """Indices into the sorted elements of sizes[i] draws from every segment i."""
+    groups = np.repeat(np.arange(len(sizes)), sizes)
+    uniforms = rng.random_array(len(groups))
+    if len(groups) == 0:
+        return groups
+    if weights is None:
+        return starts[groups] + np.minimum((uniforms * counts[groups]).astype(np.intp), counts[groups] - 1)
+
+    # Normalizing the weights of every group to sum to one bounds the cumulative sum by the
+    # number of groups, so a group after a large total keeps the precision of its weights
+    group_sums = np.bincount(np.repeat(np.arange(len(sizes)), counts), weights=weights, minlength=len(sizes))
+    if np.any((group_sums == 0) & (sizes > 0)):
+        raise ValueError("Cannot sample with replacement from a group whose weights are all zero")
+    weights = weights / np.repeat(np.where(group_sums > 0, group_sums, 1.0), counts)
+
+    cumulative_weights = np.cumsum(weights)
+    ends = starts + counts
+    lower = np.where(starts > 0, cumulative_weights[starts - 1], 0.0)
+    upper = cumulative_weights[ends - 1]
+
+    # Searching to the right never returns an element with zero weight, and clipping
+    # keeps rounding errors at the ends of a segment within the segment
+    picks = lower[groups] + uniforms * (upper - lower)[groups]
+    indices = np.searchsorted(cumulative_weights, picks, side="right")
+    return np.clip(indices, starts[groups], ends[groups] - 1)
@@ -0,0 +1,33 @@
+"""
+Deferred import of NumPy.
+
+Modules use `from sampling.lazy import np` in place of `import numpy as np`. NumPy
+is imported on the first attribute lookup, such as when a weighted structure is
+built, so `import sampling` and unweighted urns seeded by the `random` module never
+pay for importing it.
+"""
+
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """A module which is imported on the first lookup of one of its attributes."""
+
+    def __getattr__(self, attribute):
+        module = importlib.import_module(self.__name__)
+        # Copy the attributes, so that later lookups never get here
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+np = LazyModule("numpy")
+
+
+def is_numpy_instance(obj, name):
+    """Whether `obj` is an instance of numpy.<name>, without importing NumPy.
+
+    If NumPy is not imported yet, no instance of its classes can exist.
+    """
+    return "numpy" in sys.modules and isinstance(obj, getattr(np, name))
@@ -0,0 +1,108 @@
+"""
+Sampling with replacement across processes.
+
+The cumulative weights are computed once and shared with the worker processes
+through shared memory. Every worker draws from its own random stream, spawned
+from a single seed, and the results are concatenated in worker order, so the
+output is deterministic for a given seed and number of workers.
+"""
+
+import os
+from sampling.lazy import np
+
+
+def _draw_indices(shared_name, num_weights, size, seed_sequence):
+    """Draw `size` indices in a worker, from cumulative weights in shared memory (or uniformly)."""
+    rng = np.random.default_rng(seed_sequence)
+    if shared_name is None:
+        return rng.integers(num_weights, size=size)
+
+    from multiprocessing import shared_memory
+
+    shared = shared_memory.SharedMemory(name=shared_name)
+    cumulative_weights = np.ndarray((num_weights,), dtype=np.float64, buffer=shared.buf)
+    picks = rng.random(size) * cumulative_weights[-1]
+    # Searching to the right never returns an element with zero weight
+    indices = np.searchsorted(cumulative_weights, picks, side="right")
+
+    # The view must be released before the shared memory can be closed
+    del cumulative_weights
+    shared.close()
+    return indices
+
+
+def sample_parallel(population, size=1, weights=None, workers=None, seed=None):
+    """
+    Draw samples with replacement from a collection, using several processes.
+
+    Parameters
+    ----------
+    population: list
+        The data points.
+
+    size: int
+        The number of samples.
+
+    weights: list
+        One weight per data point. If None is passed, uniform weights are used.
+
+    workers: int
+        The number of worker processes. If None, the number of processors is used.
+        With a single worker, everything runs in the calling process.
+
+    seed: None, int or numpy.random.SeedSequence
+        The seed of the random streams of the workers, which are spawned with
+        `SeedSequence.spawn`. If None, fresh entropy is used. Spawning changes the state
+        of a SeedSequence, so pass an int to reproduce results across calls.
+
+    Returns
+    -------
+    list
+    Returns a new list of length size containing elements from the population.
+
+    Examples
+    --------
+    >>> data = [1, 3, 4, 7]
+    >>> weights = [3, 4, 2, 1]
+    >>> samples = sample_parallel(data, size=10**6, weights=weights, workers=4, seed=42)
+
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("'workers' must be a positive integer")
+    if len(population) == 0:
+        raise ValueError("Cannot sample from an empty population")
+
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    seed_sequences = seed_sequence.spawn(workers)
+    sizes = [size // workers + (i < size % workers) for i in range(workers)]
+
+    shared = None
+    if weights is not None:
+        assert len(weights) == len(population)
+        weights = np.asarray(weights, dtype=np.float64)
+        assert np.all(weights >= 0)
+
+        from multiprocessing import shared_memory
+
+        shared = shared_memory.SharedMemory(create=True, size=weights.nbytes)
+        np.cumsum(weights, out=np.ndarray(weights.shape, dtype=np.float64, buffer=shared.buf))
+
+    try:
+        arguments = [shared and shared.name] * workers, [len(population)] * workers, sizes, seed_sequences
+        if workers == 1:
+            results = list(map(_draw_indices, *arguments))
+        else:
+            import concurrent.futures
+
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_draw_indices, *arguments))
+    finally:
+        if shared is not None:
+            shared.close()
+            shared.unlink()
+
+    indices = np.concatenate(results)
+    if isinstance(population, np.ndarray):
+        return population[indices].tolist()
+    return [population[index] for index in indices.tolist()]
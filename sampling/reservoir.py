@@ -0,0 +1,204 @@
+"""
+Reservoir sampling from streams of unknown length, in one pass and O(size) memory.
+
+Both algorithms jump over the elements that do not enter the reservoir, so after the
+reservoir has filled up, random numbers are only generated for the O(size log(n / size))
+elements that do.
+"""
+
+import heapq
+import itertools
+import math
+from sampling.lazy import is_numpy_instance, np
+from sampling.rng import make_rng
+
+_EXHAUSTED = object()
+
+
+def _open_uniform(rng):
+    """A uniform random number in the open interval (0, 1)."""
+    u = rng.random()
+    while u == 0:
+        u = rng.random()
+    return u
+
+
+def reservoir_sample(stream, size=1, weights=None, rng=None):
+    """Draw samples without replacement from an iterable, consuming it once.
+
+    Parameters
+    ----------
+    stream: iterable
+        The data points. If the stream yields NumPy arrays, every array is treated as
+        a chunk of data points, and jumps within a chunk are resolved with NumPy.
+
+    size: int
+        The number of samples. If the stream is shorter, all of it is returned.
+
+    weights: iterable or callable
+        One weight per data point, or one array of weights per chunk. A callable is
+        applied to every data point (or to every chunk) to compute the weights. If
+        None is passed, uniform weights are used.
+
+    rng: None, int, numpy.random.Generator
+        The source of random numbers. See `sampling.rng.make_rng`.
+
+    Returns
+    -------
+    list
+    The samples, in an order distributed like the order of sequential draws.
+
+    Examples
+    --------
+    >>> lines = (line for line in ["a", "b", "c", "d"])
+    >>> samples = reservoir_sample(lines, size=2)
+    >>> samples = reservoir_sample(iter(range(10)), size=3, weights=lambda x: x + 1)
+
+    """
+    rng = make_rng(rng)
+    iterator = iter(stream)
+    first = next(iterator, _EXHAUSTED)
+    if first is _EXHAUSTED or size <= 0:
+        return []
+    iterator = itertools.chain([first], iterator)
+    chunked = is_numpy_instance(first, "ndarray")
+
+    if weights is None:
+        sampler = _algorithm_l_chunks if chunked else _algorithm_l
+        return sampler(iterator, size, rng)
+
+    if callable(weights):
+        key = weights
+        if chunked:
+            return _a_expj_chunks(((chunk, np.asarray(key(chunk), dtype=float)) for chunk in iterator), size, rng)
+        return _a_expj(((element, key(element)) for element in iterator), size, rng)
+
+    sampler = _a_expj_chunks if chunked else _a_expj
+    return sampler(zip(iterator, weights), size, rng)
+
+
+def _algorithm_l(iterator, size, rng):
+    """Li's Algorithm L for unweighted samples."""
+    reservoir = list(itertools.islice(iterator, size))
+
+    if len(reservoir) == size:
+        w = math.exp(math.log(_open_uniform(rng)) / size)
+        while True:
+            # Jump directly to the next element entering the reservoir
+            skip = math.floor(math.log(_open_uniform(rng)) / math.log(1 - w))
+            element = next(itertools.islice(iterator, skip, None), _EXHAUSTED)
+            if element is _EXHAUSTED:
+                break
+            reservoir[rng.randrange(size)] = element
+            w *= math.exp(math.log(_open_uniform(rng)) / size)
+
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def _algorithm_l_chunks(chunks, size, rng):
+    """Li's Algorithm L for unweighted samples, over a stream of arrays."""
+    reservoir = []
+    chunk, offset = np.empty(0), 0
+    for chunk in chunks:
+        offset = min(size - len(reservoir), len(chunk))
+        reservoir.extend(chunk[:offset])
+        if len(reservoir) == size:
+            break
+
+    if len(reservoir) == size:
+        w = math.exp(math.log(_open_uniform(rng)) / size)
+        while True:
+            skip = math.floor(math.log(_open_uniform(rng)) / math.log(1 - w))
+
+            # Jump over whole chunks, then within a chunk
+            while skip >= len(chunk) - offset:
+                skip -= len(chunk) - offset
+                chunk, offset = next(chunks, None), 0
+                if chunk is None:
+                    rng.shuffle(reservoir)
+                    return reservoir
+
+            reservoir[rng.randrange(size)] = chunk[offset + skip]
+            offset += skip + 1
+            w *= math.exp(math.log(_open_uniform(rng)) / size)
+
+    rng.shuffle(reservoir)
+    return reservoir
+
+
+def _a_expj(pairs, size, rng):
+    """Efraimidis and Spirakis' A-ExpJ for weighted samples, over (element, weight) pairs.
+
+    Every element gets the key u^(1/w), and the elements with the largest keys are kept.
+    Logarithms of the keys are used, since the keys themselves underflow for large weights.
+    """
+    reservoir = []  # A heap of (log of key, counter, element), with the smallest key first
+    counter = itertools.count()
+    for element, weight in pairs:
+        _push(reservoir, element, weight, next(counter), rng)
+        if len(reservoir) == size:
+            break
+
+    if len(reservoir) == size:
+        threshold = reservoir[0][0]
+        jump = math.log(_open_uniform(rng)) / threshold
+        for element, weight in pairs:
+            if weight <= 0:
+                continue
+            jump -= weight
+            if jump <= 0:
+                threshold = _replace(reservoir, element, weight, threshold, next(counter), rng)
+                jump = math.log(_open_uniform(rng)) / threshold
+
+    return [element for (_, _, element) in sorted(reservoir, key=lambda entry: entry[:2], reverse=True)]
+
+
+def _a_expj_chunks(pairs, size, rng):
+    """Efraimidis and Spirakis' A-ExpJ for weighted samples, over (chunk, weights) array pairs."""
+    reservoir = []
+    counter = itertools.count()
+    chunk, chunk_weights, offset = np.empty(0), np.empty(0), 0
+    for chunk, chunk_weights in pairs:
+        offset = 0
+        while offset < len(chunk) and len(reservoir) < size:
+            _push(reservoir, chunk[offset], chunk_weights[offset], next(counter), rng)
+            offset += 1
+        if len(reservoir) == size:
+            break
+
+    if len(reservoir) == size:
+        threshold = reservoir[0][0]
+        jump = math.log(_open_uniform(rng)) / threshold
+        cumulative_weights = np.cumsum(chunk_weights)
+        while True:
+            # Find the element where the cumulative weight passes the jump, or move on
+            consumed = cumulative_weights[offset - 1] if offset > 0 else 0
+            index = np.searchsorted(cumulative_weights, consumed + jump, side="right")
+            if index >= len(chunk):
+                jump -= (cumulative_weights[-1] - consumed) if len(chunk) else 0
+                chunk, chunk_weights = next(pairs, (None, None))
+                if chunk is None:
+                    break
+                cumulative_weights, offset = np.cumsum(chunk_weights), 0
+                continue
+
+            threshold = _replace(reservoir, chunk[index], chunk_weights[index], threshold, next(counter), rng)
+            jump = math.log(_open_uniform(rng)) / threshold
+            offset = index + 1
+
+    return [element for (_, _, element) in sorted(reservoir, key=lambda entry: entry[:2], reverse=True)]
+
+
+def _push(reservoir, element, weight, count, rng):
+    log_key = math.log(_open_uniform(rng)) / weight if weight > 0 else -math.inf
+    heapq.heappush(reservoir, (log_key, count, element))
+
+
+def _replace(reservoir, element, weight, threshold, count, rng):
+    """Replace the smallest key by the key of an element known to exceed it, and return the new threshold."""
+    # The key u^(1/w) is conditioned on exceeding the threshold, so u is uniform on (threshold^w, 1)
+    t = math.exp(weight * threshold)
+    log_key = math.log(t + (1 - t) * _open_uniform(rng)) / weight
+    heapq.heapreplace(reservoir, (log_key, count, element))
+    return reservoir[0][0]
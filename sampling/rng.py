@@ -0,0 +1,143 @@
+"""
+Sources of random numbers for urns and sampling functions.
+
+Every urn holds its own source, created by `make_rng`. By default the global state of
+the `random` and `numpy.random` modules is used, so `random.seed` and `np.random.seed`
+make results reproducible. Passing a seed or a `numpy.random.Generator` gives every
+urn an independent, reproducible stream, whose uniforms are generated in blocks.
+"""
+
+import functools
+import itertools
+import random
+import numbers
+from sampling.lazy import np
+
+
+class GlobalRandom:
+    """Random numbers from the global state of the `random` and `numpy.random` modules.
+
+    Single uniforms, and lists of them, come from `random`, so that NumPy is only imported
+    by the methods which return arrays.
+    """
+
+    @staticmethod
+    def random_array(size):
+        return np.random.random(size)
+
+    @staticmethod
+    def random_list(size):
+        return [random.random() for _ in range(size)]
+
+    @staticmethod
+    def standard_exponential(size):
+        return np.random.standard_exponential(size)
+
+    @staticmethod
+    def hypergeometric(ngood, nbad, nsample):
+        return np.random.hypergeometric(ngood, nbad, nsample)
+
+    @staticmethod
+    def multinomial(n, pvals):
+        return np.random.multinomial(n, pvals)
+
+    randrange = staticmethod(random.randrange)
+    shuffle = staticmethod(random.shuffle)
+    random = staticmethod(random.random)  # Last, since the name shadows the module
+
+    def __repr__(self):
+        return type(self).__name__
+
+
+class BufferedRandom:
+    """Random numbers from a `numpy.random.Generator`, with single uniforms generated in blocks.
+
+    Calling `random()` consumes a uniform from a block of `buffer_size` uniforms, which is
+    refilled in bulk. The method is implemented in C through `itertools`, so it costs far
+    less than a call to the generator. It still costs more than `random.random()`, as the
+    blocks are converted to Python floats, so seeded sources are for reproducibility and
+    independent streams, not for faster single draws. Draws of many elements at once use
+    the generator's arrays directly.
+    """
+
+    def __init__(self, generator, buffer_size=1024):
+        if buffer_size < 1:
+            raise ValueError("'buffer_size' must be a positive integer")
+        self.generator = generator
+        self.buffer_size = buffer_size
+        # The legacy hypergeometric sampler accepts populations of 10**9 and more, unlike
+        # the one of generators, and draws from the same stream
+        self._legacy = np.random.RandomState(generator.bit_generator)
+
+        blocks = iter(lambda: generator.random(buffer_size).tolist(), None)
+        self.random = functools.partial(next, itertools.chain.from_iterable(blocks))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.generator!r}, buffer_size={self.buffer_size})"
+
+    def __getstate__(self):
+        # Uniforms buffered but not yet consumed are not saved, so a restored source
+        # continues with a fresh block from the state of the generator
+        return {"generator": self.generator, "buffer_size": self.buffer_size}
+
+    def __setstate__(self, state):
+        self.__init__(state["generator"], state["buffer_size"])
+
+    def random_array(self, size):
+        return self.generator.random(size)
+
+    def random_list(self, size):
+        return self.generator.random(size).tolist()
+
+    def standard_exponential(self, size):
+        return self.generator.standard_exponential(size)
+
+    def hypergeometric(self, ngood, nbad, nsample):
+        return self._legacy.hypergeometric(ngood, nbad, nsample)
+
+    def multinomial(self, n, pvals):
+        return self.generator.multinomial(n, pvals)
+
+    def randrange(self, n):
+        return int(self.generator.integers(n))
+
+    def shuffle(self, x):
+        self.generator.shuffle(x)
+
+
+_GLOBAL_RANDOM = GlobalRandom()
+
+
+def make_rng(rng=None, buffer_size=1024):
+    """Create a source of random numbers.
+
+    Parameters
+    ----------
+    rng: None, int, numpy.random.SeedSequence, numpy.random.Generator
+        If None, the global state of the `random` and `numpy.random` modules is used.
+        Otherwise, uniforms are drawn in blocks from a generator, seeded if need be.
+        Sources returned by this function are passed through unchanged.
+
+    buffer_size: int
+        The number of uniforms generated at a time by a seeded generator.
+
+    Returns
+    -------
+    GlobalRandom or BufferedRandom
+
+    Examples
+    --------
+    >>> rng = make_rng(42)
+    >>> 0 <= rng.random() < 1
+    True
+
+    """
+    if rng is None:
+        return _GLOBAL_RANDOM
+    if isinstance(rng, (GlobalRandom, BufferedRandom)):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        return BufferedRandom(rng, buffer_size=buffer_size)
+    if isinstance(rng, (numbers.Integral, np.random.SeedSequence)):
+        return BufferedRandom(np.random.default_rng(rng), buffer_size=buffer_size)
+    raise TypeError(f"'rng' must be None, a seed or a numpy.random.Generator, got {type(rng).__name__}")
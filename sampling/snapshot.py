@@ -0,0 +1,78 @@
+"""
+Saving and loading urns, without rebuilding or revalidating them.
+
+An urn is pickled with protocol 5, and its NumPy arrays (weights, cumulative sums,
+trees) are written as raw out-of-band buffers after the pickle. Loading memory-maps
+the file copy-on-write, and the arrays of the loaded urn are views into the map, so
+they are read from disk lazily and the file is never modified. Before Python 3.8,
+which added protocol 5, urns are pickled with protocol 4 and their arrays in-band, so
+they are read when loading.
+
+File layout: the magic string, a JSON header with the length of the pickle and the
+offsets and lengths of the buffers, then the pickle and the buffers, every buffer
+aligned to 64 bytes.
+"""
+
+import json
+import mmap
+import pickle
+import struct
+
+_MAGIC = b"SAMPLING-URN-1\n"
+_ALIGNMENT = 64
+
+
+def save(urn, path):
+    """Save an urn to a file, see `load`."""
+    buffers = []
+    if pickle.HIGHEST_PROTOCOL >= 5:
+        data = pickle.dumps(urn, protocol=5, buffer_callback=buffers.append)
+    else:
+        data = pickle.dumps(urn, protocol=4)
+    raw_buffers = [buffer.raw() for buffer in buffers]
+
+    # Compute the offsets of the buffers, relative to the end of the header
+    offsets, offset = [], len(data)
+    for raw in raw_buffers:
+        offset += -offset % _ALIGNMENT
+        offsets.append(offset)
+        offset += raw.nbytes
+    header = json.dumps({"pickle": len(data), "offsets": offsets, "lengths": [raw.nbytes for raw in raw_buffers]})
+    header = header.encode() + b" " * (-(len(_MAGIC) + 8 + len(header)) % _ALIGNMENT)
+
+    with open(path, "wb") as file:
+        file.write(_MAGIC + struct.pack("<Q", len(header)) + header)
+        file.write(data)
+        position = len(data)
+        for offset, raw in zip(offsets, raw_buffers):
+            file.write(b"\0" * (offset - position))
+            file.write(raw)
+            position = offset + raw.nbytes
+
+
+def load(path):
+    """Load an urn saved with `save`, memory-mapping its arrays instead of reading them.
+
+    The file is mapped copy-on-write, so the loaded urn may be used and changed freely
+    without modifying the file.
+
+    Warning: the urn is restored with `pickle`, which can run arbitrary code. Never load
+    a file which does not come from a trusted source.
+    """
+    with open(path, "rb") as file:
+        if file.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path!r} is not a saved urn")
+        (header_length,) = struct.unpack("<Q", file.read(8))
+        header = json.loads(file.read(header_length))
+        start = len(_MAGIC) + 8 + header_length
+        mapped = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY))
+
+    data = mapped[start : start + header["pickle"]]
+    buffers = [
+        mapped[start + offset : start + offset + length] for offset, length in zip(header["offsets"], header["lengths"])
+    ]
+    if not buffers:
+        return pickle.loads(data)
+    if pickle.HIGHEST_PROTOCOL < 5:
+        raise ValueError(f"{path!r} was saved with out-of-band buffers, which need Python 3.8 or later")
+    return pickle.loads(data, buffers=buffers)
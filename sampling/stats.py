@@ -0,0 +1,158 @@
+"""
+Opt-in counters and timings of the operations on urns and their weight structures.
+
+Enabling stats on an urn replaces its class, and the class of its weight structure,
+by a subclass which counts and times every public operation. Urns without stats run
+the original classes, so they pay nothing.
+
+Operations are named after the object and the method, such as "urn.draw" or
+"structure.update_weights". Only the outermost operation on an object is recorded,
+so a draw counts once however many removals it performs. Rebuilds of a structure are
+recorded as "structure.rebuild" wherever they happen, as they are often the cause
+of slow operations.
+"""
+
+import collections
+import functools
+import time
+
+URN_OPERATIONS = (
+    "__next__",
+    "__contains__",
+    "draw",
+    "draw_counts",
+    "add",
+    "extend",
+    "remove",
+    "update_weight",
+    "update_weights",
+    "update_element_weight",
+    "update_element_weights",
+    "scale_weights",
+    "boost_weights",
+    "reset",
+)
+STRUCTURE_OPERATIONS = ("query", "query_many", "update_weight", "update_weights", "remove", "remove_many", "extend")
+
+# Operations which touch a single element, others touch the elements of their first argument
+_SINGLE_ELEMENT_OPERATIONS = {
+    "__next__",
+    "__contains__",
+    "add",
+    "remove",
+    "query",
+    "update_weight",
+    "update_element_weight",
+}
+
+
+class Stats:
+    """The number of calls, elements touched and seconds spent per operation.
+
+    If a callback is given, it is called as callback(operation, elements, seconds)
+    after every recorded operation, for instance to export the numbers to a metrics system.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.calls = collections.Counter()
+        self.elements = collections.Counter()
+        self.seconds = collections.Counter()
+        self._running = set()  # The kinds of objects, "urn" or "structure", inside an operation
+
+    def record(self, operation, elements, seconds):
+        self.calls[operation] += 1
+        self.elements[operation] += elements
+        self.seconds[operation] += seconds
+        if self.callback is not None:
+            self.callback(operation, elements, seconds)
+
+    def as_dict(self):
+        return {
+            operation: {"calls": calls, "elements": self.elements[operation], "seconds": self.seconds[operation]}
+            for operation, calls in self.calls.items()
+        }
+
+
+def _elements(name, args, result):
+    if name == "draw":
+        return len(result)
+    if name == "draw_counts":
+        # A Counter of elements, or an array of counts per position for index urns
+        return int(sum(result.values()) if isinstance(result, dict) else result.sum())
+    if name in _SINGLE_ELEMENT_OPERATIONS:
+        return 1
+    return len(args[0]) if args and hasattr(args[0], "__len__") else 0
+
+
+def _timed(kind, name, method):
+    operation = f"{kind}.{name.strip('_')}"
+
+    @functools.wraps(method)
+    def timed(self, *args, **kwargs):
+        stats = self._stats
+        if kind in stats._running:
+            return method(self, *args, **kwargs)
+
+        stats._running.add(kind)
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        finally:
+            stats._running.discard(kind)
+        stats.record(operation, _elements(name, args, result), time.perf_counter() - start)
+        return result
+
+    return timed
+
+
+def _timed_rebuild(method):
+    @functools.wraps(method)
+    def timed(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        self._stats.record("structure.rebuild", len(self), time.perf_counter() - start)
+        return result
+
+    return timed
+
+
+def _reduce_ex(self, protocol):
+    # Copies and pickles are made of the original class, without stats
+    _, _, state, *rest = super(type(self), self).__reduce_ex__(protocol)
+    if isinstance(state, dict):
+        state = {name: value for name, value in state.items() if name != "_stats"}
+    return (object.__new__, (type(self)._original,), state, *rest)
+
+
+@functools.lru_cache(maxsize=None)
+def _instrumented(cls, kind):
+    """A subclass of `cls` which records its operations, created once per class."""
+    operations = URN_OPERATIONS if kind == "urn" else STRUCTURE_OPERATIONS
+    namespace = {name: _timed(kind, name, getattr(cls, name)) for name in operations if hasattr(cls, name)}
+    if hasattr(cls, "_build"):
+        namespace["_build"] = _timed_rebuild(cls._build)
+    namespace.update(_original=cls, __reduce_ex__=_reduce_ex, __module__=cls.__module__)
+    return type(cls.__name__, (cls,), namespace)
+
+
+def enable(urn, callback=None):
+    """Record the operations on `urn` and its weight structure, replacing the callback if already enabled."""
+    if urn._stats is not None:
+        urn._stats.callback = callback
+        return urn._stats
+
+    stats = Stats(callback)
+    urn.__class__, urn._stats = _instrumented(type(urn), "urn"), stats
+    structure = getattr(urn, "_cumulative_sum_object", None)
+    if structure is not None:
+        structure.__class__, structure._stats = _instrumented(type(structure), "structure"), stats
+    return stats
+
+
+def disable(urn):
+    """Stop recording the operations on `urn`, restoring its original class."""
+    for obj in (urn, getattr(urn, "_cumulative_sum_object", None)):
+        if getattr(obj, "_stats", None) is not None:
+            obj.__class__ = type(obj)._original
+            del obj._stats
@@ -0,0 +1,40 @@
+from sampling.alias import AliasTable
+import numpy as np
+import random
+import pytest
+
+
+@pytest.mark.parametrize("num_weights", [1, 10, 100])
+def test_frequencies(num_weights):
+    """Test that:
+    - Indices are drawn with probabilities proportional to the weights
+    - Single and vectorized queries agree
+    """
+
+    random.seed(42)
+    weights = [random.random() for _ in range(num_weights)]
+    weights[0] = 0
+    weights.append(1)
+    table = AliasTable(weights)
+
+    search_weights = np.linspace(0, table.get_sum(), 100_000)
+    indices = table.query_many(search_weights)
+    assert list(indices[::1000]) == [table.query(w) for w in search_weights[::1000]]
+
+    frequencies = np.bincount(indices, minlength=len(weights)) / len(indices)
+    assert frequencies[0] == 0
+    assert np.allclose(frequencies, np.array(weights) / sum(weights), atol=1e-3)
+
+
+def test_rebuild_after_changes():
+    """Test that:
+    - The table is rebuilt after updates, removals and extensions
+    """
+
+    table = AliasTable([1, 1, 1])
+    table.update_weight(0, 0)
+    table.remove(1)
+    table.extend([0])
+    assert list(table.weights) == [0, 1, 0]
+    assert table.get_sum() == 1
+    assert set(table.query_many(np.linspace(0, 1, 100))) == {1}
@@ -1,7 +1,11 @@
 from sampling import Urn, sample
+from sampling.utils import permute
 import itertools
 import random
 import pytest
+import numpy as np
+
+BACKENDS = ("cumsum", "tree", "fenwick", "alias", "buckets")
 
 
 class TestUrn:
@@ -103,6 +107,20 @@ class TestUrn:
         assert samples1 == samples3
         assert samples2 == samples3
 
+    @pytest.mark.parametrize(
+        "replace, weights, copy", list(itertools.product((True, False), (None, [1, 2, 3, 4, 5]), (True, False)))
+    )
+    def test_seeded_urns_are_reproducible(self, replace, weights, copy):
+        """Test that urns with the same seed draw the same elements, and ignore the global state."""
+
+        def draws(seed):
+            random.seed(seed)
+            np.random.seed(seed)
+            urn = Urn("abcde", replace=replace, weights=weights, copy=copy, rng=42, buffer_size=2)
+            return [next(urn), next(urn)] + urn.draw(2) + [next(urn)]
+
+        assert draws(1) == draws(2)
+
     def test_list_extension(self):
         """Test the extend method"""
         data = "abcdef"
@@ -172,6 +190,282 @@ class TestUrn:
             assert element not in urn
         assert urn.size() == 3 or urn.size() == float("inf")
 
+    def test_remove_after_draws(self):
+        """Test that removing elements keeps previously drawn elements out of the urn"""
+        data = "abcdef"
+        urn = Urn(data, replace=False)
+        drawn = urn.draw(2)
+        remaining = [element for element in data if element not in drawn]
+        urn.remove(remaining[0])
+        assert urn.size() == 3
+        assert set(urn) == set(remaining[1:])
+
+    @pytest.mark.parametrize("replace", [True, False])
+    def test_update_element_weight(self, replace):
+        data = "abcdef"
+        weights = [1, 2, 3, 4, 5, 6]
+        urn = Urn(data, replace, weights)
+        for element in "abcde":
+            urn.update_element_weight(element, 0)
+        # Without replacement, zero-weight elements are drawn once "f" is gone
+        assert set(itertools.islice(urn, 100 if replace else 1)) == {"f"}
+
+    @pytest.mark.parametrize("backend, replace", list(itertools.product(BACKENDS, (True, False))))
+    def test_update_weights(self, backend, replace):
+        data = "abcdef"
+        urn = Urn(data, replace, [1, 2, 3, 4, 5, 6], backend=backend)
+        urn.update_weights([0, 1, 2], [0, 0, 0])
+        urn.update_element_weights("de", [0, 0])
+        assert set(itertools.islice(urn, 100 if replace else 1)) == {"f"}
+        with pytest.raises(TypeError):
+            urn.update_weights([0.5], [1])
+        with pytest.raises(ValueError):
+            urn.update_weights([0], [-1])
+
+    @pytest.mark.parametrize("backend, replace", list(itertools.product(BACKENDS, (True, False))))
+    def test_scale_and_boost_weights(self, backend, replace):
+        """Test that:
+        - Scaling and boosting every weight leave the structure unchanged
+        - Draws follow the scaled and boosted weights, and the weights given to new elements
+        - Resetting puts back the elements with the weights they had when they were drawn
+        """
+        urn = Urn("abcd", replace, [1, 2, 3, 4], backend=backend, rng=1)
+        stored = list(urn._cumulative_sum_object.weights)
+        urn.scale_weights(0.5)
+        urn.boost_weights(1)
+        assert list(urn._cumulative_sum_object.weights) == stored
+        urn.add("e", 2)
+        urn.update_element_weight("a", 4)
+        # A weight below the boost is stored once the boost is applied to every weight
+        urn.add("f", 0.5)
+        expected = {"a": 4, "b": 2, "c": 2.5, "d": 3, "e": 2, "f": 0.5}
+
+        if replace:
+            drawn = urn.draw(20000) + [next(urn) for _ in range(20000)]
+            total = sum(expected.values())
+            for element, weight in expected.items():
+                assert drawn.count(element) / len(drawn) == pytest.approx(weight / total, abs=0.01)
+        else:
+            assert sorted(urn.draw(3) + list(urn)) == sorted(expected)
+            urn.reset()
+            assert {element: urn._weight(urn._positions[element]) for element in expected} == pytest.approx(expected)
+
+        for invalid in (0, -1, float("nan")):
+            with pytest.raises(ValueError):
+                urn.scale_weights(invalid)
+        with pytest.raises(ValueError):
+            urn.boost_weights(-1)
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_draw_counts(self, backend):
+        """Test that:
+        - Counts of many draws with replacement sum to the size, and follow the weights
+        - Elements of zero weight are never counted, unless their weight is boosted
+        - Index urns count every position of the population
+        """
+        weights = [0, 1, 2, 3, 4] if backend != "cumsum" else [1e-300, 1, 2, 3, 4]
+        urn = Urn("abcde", replace=True, weights=weights, backend=backend, rng=1)
+        counts = urn.draw_counts(10 ** 6)
+        assert sum(counts.values()) == 10 ** 6 and "a" not in counts
+        assert all(counts[element] / 10 ** 6 == pytest.approx(i / 10, abs=0.01) for i, element in enumerate("bcde", 1))
+
+        urn.boost_weights(1)
+        assert urn.draw_counts(10 ** 5)["a"] / 10 ** 5 == pytest.approx(1 / 15, abs=0.01)
+
+        urn = Urn("abcde", replace=True, weights=weights, backend=backend, return_indices=True, rng=1)
+        urn._remove_index(urn._positions[1])
+        counts = urn.draw_counts(1000)
+        assert counts.dtype == np.int64 and counts.shape == (5,) and counts.sum() == 1000
+        assert counts[0] == counts[1] == 0
+
+    @pytest.mark.parametrize("replace", [True, False])
+    def test_add_duplicate_weighted(self, replace):
+        urn = Urn("abc", replace, [1, 2, 3])
+        with pytest.raises(AssertionError):
+            urn.add("a", 1)
+        # A duplicate within a batch, or after new elements, leaves the urn unchanged
+        for elements in ("xax", "xyy"):
+            with pytest.raises(AssertionError):
+                urn.extend(elements, [1, 1, 1])
+            assert "x" not in urn and "y" not in urn
+        assert sorted(urn.draw(3) if not replace else set(urn.draw(100))) == ["a", "b", "c"]
+
+    @pytest.mark.parametrize("backend, replace", list(itertools.product(BACKENDS, (True, False))))
+    def test_backends(self, backend, replace):
+        """Test that every backend draws all elements, also after removals and additions."""
+        data = "abcdef"
+        weights = [1, 2, 3, 4, 5, 6]
+        urn = Urn(data, replace=replace, weights=weights, backend=backend)
+        urn.remove("b")
+        urn.add("x", 7)
+        assert set(itertools.islice(urn, 1000)) == set("acdefx")
+
+    def test_invalid_backend(self):
+        with pytest.raises(ValueError):
+            Urn("abc", weights=[1, 2, 3], backend="unknown")
+
+    @pytest.mark.parametrize(
+        "weights, backend", [(None, "cumsum"), ([1, 2, 3, 4, 5, 6], "cumsum"), ([1, 2, 3, 4, 5, 6], "tree")]
+    )
+    def test_draw_without_replacement(self, weights, backend):
+        """Test that draw(k) leaves the urn in the same state as k calls to next()."""
+        data = "abcdef"
+        urn = Urn(data, replace=False, weights=weights, backend=backend)
+        drawn = urn.draw(2)
+        assert len(drawn) == len(set(drawn)) == 2
+        assert urn.size() == 4
+        assert all(element not in urn for element in drawn)
+
+        # Drawing more than what is left returns the rest
+        rest = urn.draw(10)
+        assert set(drawn + rest) == set(data)
+        assert urn.size() == 0
+        assert urn.draw(1) == []
+
+    @pytest.mark.parametrize("weights", [None, [1, 2, 3, 4, 5, 6]])
+    def test_draw_with_replacement(self, weights):
+        data = "abcdef"
+        urn = Urn(data, replace=True, weights=weights)
+        drawn = urn.draw(1000)
+        assert len(drawn) == 1000
+        assert set(drawn) == set(data)
+
+    @pytest.mark.parametrize("replace, backend", list(itertools.product((True, False), ("cumsum", "tree"))))
+    def test_draw_distribution(self, replace, backend):
+        """Test that the first element drawn by draw(k) has the same distribution as next()."""
+        counts = {"a": 0, "b": 0, "c": 0}
+        for _ in range(3000):
+            urn = Urn("abc", replace=replace, weights=[1, 2, 3], backend=backend)
+            counts[urn.draw(2)[0]] += 1
+        assert counts["a"] / 3000 == pytest.approx(1 / 6, abs=0.05)
+        assert counts["c"] / 3000 == pytest.approx(3 / 6, abs=0.05)
+
+    def test_sparse_urn_over_range(self):
+        """Test that an urn over a huge range is not materialized, and supports the urn interface."""
+        data = range(10 ** 12)
+        urn = Urn(data, replace=False)
+        drawn = urn.draw(1000) + [next(urn)]
+        assert len(set(drawn)) == 1001
+        assert urn.size() == 10 ** 12 - 1001
+        assert all(element not in urn for element in drawn)
+
+        urn.remove(5)
+        assert 5 not in urn
+        urn.add(drawn[0])
+        assert drawn[0] in urn
+        assert urn.size() == 10 ** 12 - 1001
+        assert len(urn._sources) <= 2 * 1003
+
+    def test_sparse_urn_exhausts_population(self):
+        urn = Urn(range(20), replace=False)
+        urn.remove(3)
+        urn.extend([100, 101])
+        first = urn.draw(5)
+        assert sorted(first + list(urn)) == [i for i in range(20) if i != 3] + [100, 101]
+
+    def test_sparse_urn_over_array(self):
+        """Test that an urn over an array with copy=False leaves the array untouched."""
+        data = np.arange(100) % 50
+        urn = Urn(data, replace=False, copy=False)
+        urn._block_size = 16
+        drawn = urn.draw(10)
+        assert np.all(data == np.arange(100) % 50)
+        assert urn.size() == 90
+
+        # Every value is in the array twice, so it is in the urn unless both copies are drawn
+        for value in range(50):
+            assert (value in urn) == (drawn.count(value) < 2)
+        remaining = [value for value in range(50) if value in urn]
+        urn.remove(remaining[0])
+        assert urn.size() == 89
+        assert sorted(drawn + list(urn) + [remaining[0]]) == sorted(data.tolist())
+
+    @pytest.mark.parametrize(
+        "weights, backend, copy",
+        [(None, "cumsum", True), (None, "cumsum", False)]
+        + [(list(range(1, 31)), backend, True) for backend in BACKENDS],
+    )
+    def test_reset_and_copy(self, weights, backend, copy):
+        """Test that:
+        - Resetting puts back every element drawn or removed
+        - Weights are restored, also after repeated resets
+        - Copies are independent of the original urn
+        """
+        data = list(range(30))
+        urn = Urn(data, replace=False, weights=weights, backend=backend, copy=copy, rng=1)
+        for _ in range(3):
+            drawn = urn.draw(10) + [next(urn)]
+            urn.remove(next(element for element in data if element in urn))
+            assert urn.size() == 18 and not any(element in urn for element in drawn)
+            urn.reset()
+            assert urn.size() == 30 and all(element in urn for element in data)
+
+        clone = urn.copy()
+        assert sorted(clone.draw(30)) == data
+        assert urn.size() == 30
+        if weights is not None:
+            position = urn._positions[29]
+            assert urn._cumulative_sum_object[position] == 30
+
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_reset_after_adding_back(self, backend):
+        """Test that resetting skips elements added back since they were taken out, and puts back the others."""
+        urn = Urn("abc", replace=False, weights=[1, 2, 3], backend=backend)
+        urn.remove("a")
+        urn.remove("b")
+        urn.add("a", 9)
+        urn.remove("a")
+        urn.add("a", 4)
+        urn.reset()
+        assert urn.size() == 3 and all(element in urn for element in "abc")
+        assert {element: urn._weight(urn._positions[element]) for element in "abc"} == {"a": 4, "b": 2, "c": 3}
+        assert sorted(urn.draw(3)) == ["a", "b", "c"]
+
+    @pytest.mark.parametrize("replace", [False, True])
+    @pytest.mark.parametrize("weights", [None, [0, 1, 2, 3, 0, 1, 2, 3, 0, 1]])
+    @pytest.mark.parametrize("backend", BACKENDS)
+    def test_return_indices(self, replace, weights, backend):
+        """Test that:
+        - Draws return int64 arrays of positions, and single draws return ints
+        - Positions are distinct without replacement, and positions with zero weight are not drawn
+        - Removed positions are put back by resetting a weighted urn
+        """
+        if backend == "cumsum" and weights is not None:
+            # The cumulative sum requires positive weights
+            weights = [weight + 1 for weight in weights]
+        data = np.arange(100, 110)
+        urn = Urn(data, replace=replace, weights=weights, backend=backend, return_indices=True, rng=1)
+        drawn = urn.draw(5)
+        single = next(urn)
+        assert drawn.dtype == np.int64 and isinstance(single, int)
+        if weights is not None:
+            assert all(weights[index] > 0 for index in drawn.tolist() + [single])
+        if not replace:
+            drawn = np.concatenate([drawn, [single], urn.draw(3)])
+            assert len(set(drawn.tolist())) == len(drawn) == 9
+            assert [index in urn for index in range(10)] == [index not in drawn for index in range(10)]
+            if weights is not None:
+                urn.reset()
+                assert urn.size() == 10 and sorted(urn.draw(10).tolist()) == list(range(10))
+
+    def test_reset_memmap_urn(self, tmp_path):
+        """Test that resetting an urn over memory maps restores the weights of the drawn elements."""
+        np.save(tmp_path / "population.npy", np.arange(100))
+        np.save(tmp_path / "weights.npy", np.arange(100, dtype=float))
+        urn = Urn(tmp_path / "population.npy", weights=tmp_path / "weights.npy", rng=1)
+        total = urn._cumulative_sum_object.get_sum()
+
+        clone = urn.copy()
+        assert len(clone.draw(50)) == 50 and urn.size() == 100
+        urn.draw(50)
+        urn.reset()
+        assert urn.size() == 100
+        assert urn._cumulative_sum_object.get_sum() == pytest.approx(total)
+        with pytest.raises(ValueError):
+            urn.update_weight(0, -1)
+        with pytest.raises(ValueError):
+            urn.update_weights([0, 1], [1, float("nan")])
+
 
 class TestSampleFunction:
     @pytest.mark.parametrize("k", [1, 5, 25])
@@ -185,3 +479,98 @@ class TestSampleFunction:
         assert isinstance(sampled_elements, list)
         assert len(sampled_elements) == 1
         assert set(sampled_elements).issubset(set(data))
+
+    @pytest.mark.parametrize("k", [1, 3, 4, 10])
+    def test_weighted_without_replacement(self, k):
+        """Test that weighted sampling without replacement never repeats a position."""
+        data = ["a", "b", "b", "c"]
+        weights = [7, 1, 2, 0]
+        sampled_elements = sample(data, size=k, replace=False, weights=weights)
+        assert len(sampled_elements) == min(k, len(data))
+        # The zero-weight element is only drawn when everything else is exhausted
+        if k >= 3:
+            assert sorted(sampled_elements[:3]) == ["a", "b", "b"]
+
+    def test_weighted_without_replacement_distribution(self):
+        """Test that the first sample is distributed proportionally to the weights."""
+        counts = {"a": 0, "b": 0, "c": 0}
+        for _ in range(3000):
+            counts[sample("abc", size=2, replace=False, weights=[1, 2, 3])[0]] += 1
+        assert counts["a"] / 3000 == pytest.approx(1 / 6, abs=0.05)
+        assert counts["c"] / 3000 == pytest.approx(3 / 6, abs=0.05)
+
+    @pytest.mark.parametrize(
+        "population, replace, weights",
+        [
+            (list(range(10)), False, None),
+            (list(range(10)), True, None),
+            (list(range(10)), False, list(range(1, 11))),
+            (list(range(10)), True, list(range(1, 11))),
+            (iter(range(10)), False, None),
+        ],
+    )
+    def test_seeded_sample_is_reproducible(self, population, replace, weights):
+        population = list(population)
+        assert sample(population, 5, replace, weights, rng=7) == sample(population, 5, replace, weights, rng=7)
+        assert sample(iter(population), 5, replace, weights, rng=7) == sample(
+            iter(population), 5, replace, weights, rng=7
+        )
+
+    @pytest.mark.parametrize("replace", [True, False])
+    def test_huge_range(self, replace):
+        """Test that ranges are not materialized."""
+        data = range(10 ** 12, 10 ** 15, 3)
+        sampled_elements = sample(data, size=1000, replace=replace)
+        assert len(sampled_elements) == 1000
+        assert all(element in data for element in sampled_elements)
+        if not replace:
+            assert len(set(sampled_elements)) == 1000
+
+    @pytest.mark.parametrize("replace", [False, True])
+    @pytest.mark.parametrize("weights", [None, [0, 1, 2, 3] * 25, lambda element: element % 4])
+    @pytest.mark.parametrize("size", [5, 100])
+    def test_return_indices(self, replace, weights, size):
+        """Test that positions are returned as int64 arrays, are distinct without replacement, and
+        never have zero weight, also when every position is drawn."""
+        data = np.arange(100)
+        indices = sample(data, size, replace=replace, weights=weights, rng=1, return_indices=True)
+        assert indices.dtype == np.int64 and len(indices) == size
+        assert np.all((0 <= indices) & (indices < 100))
+        if not replace:
+            assert len(set(indices.tolist())) == size
+        if weights is not None and (replace or size < 75):
+            assert np.all(indices % 4 != 0)
+
+    @pytest.mark.parametrize("replace", [False, True])
+    @pytest.mark.parametrize("weights", [None, [0, 1, 2, 3] * 25, lambda element: element % 4])
+    def test_return_counts(self, replace, weights):
+        """Test that counts have one entry per position, sum to the size, and are zero for zero weights."""
+        data = np.arange(100)
+        counts = sample(data, 50, replace=replace, weights=weights, rng=1, return_counts=True)
+        assert counts.dtype == np.int64 and counts.shape == (100,) and counts.sum() == 50
+        if not replace:
+            assert counts.max() == 1
+        if weights is not None:
+            assert np.all(counts[::4] == 0)
+        with pytest.raises(ValueError):
+            sample(data, 5, return_indices=True, return_counts=True)
+
+    def test_weighted_indices_with_replacement_edge_cases(self):
+        """Test that no positions are drawn from an empty population, and none from zero weights."""
+        empty = sample([], size=0, replace=True, weights=[], return_indices=True)
+        assert empty.dtype == np.int64 and empty.shape == (0,)
+        with pytest.raises(ValueError):
+            sample([1, 2, 3], size=2, replace=True, weights=[0, 0, 0], return_indices=True)
+
+    def test_sequence_without_replacement_frequencies(self):
+        counts = {element: 0 for element in "abcde"}
+        for _ in range(3000):
+            for element in sample("abcde", size=2):
+                counts[element] += 1
+        assert all(count / 3000 == pytest.approx(2 / 5, abs=0.05) for count in counts.values())
+
+    @pytest.mark.parametrize("population", [range(1000), list(range(1000))])
+    def test_permute(self, population):
+        permutation = permute(population, rng=3)
+        assert isinstance(permutation, list) and sorted(permutation) == list(range(1000))
+        assert permutation == permute(population, rng=3) != list(range(1000))
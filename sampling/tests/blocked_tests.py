@@ -0,0 +1,63 @@
+from sampling.blocked import BlockedCumulativeSum
+from sampling import Urn
+import numpy as np
+import random
+import pytest
+
+
+@pytest.mark.parametrize("num_weights, block_size", [(1, 4), (100, 1), (100, 7), (1000, 64)])
+def test_query_matches_cumulative_sum(num_weights, block_size):
+    """Test that:
+    - Queries agree with a cumulative sum over all the weights, searching to the right
+    - Elements with zero weight are never returned, also after updates
+    """
+
+    random.seed(42)
+    weights = np.array([random.random() for _ in range(num_weights)])
+    weights[::3] = 0
+    weights[-1] = 1
+    blocked = BlockedCumulativeSum(weights, block_size=block_size)
+
+    indices = [random.randrange(num_weights) for _ in range(num_weights // 2)]
+    blocked.update_weights(indices, [0] * len(indices))
+    weights[indices] = 0
+    blocked.update_weight(num_weights - 1, 2)
+    weights[-1] = 2
+
+    reference = np.cumsum(weights)
+    search_weights = np.array([0, blocked.get_sum()] + [random.random() * blocked.get_sum() for _ in range(1000)])
+    indices = blocked.query_many(search_weights)
+    assert np.isclose(blocked.get_sum(), reference[-1])
+    assert np.all(weights[indices] > 0)
+    assert list(indices[2:]) == list(np.searchsorted(reference, search_weights[2:], side="right"))
+    assert blocked.query(search_weights[5]) == indices[5]
+
+
+@pytest.mark.parametrize("replace", [True, False])
+def test_urn_over_npy_files(tmp_path, replace):
+    """Test that:
+    - Urns over memory-mapped .npy files draw every element with positive weight
+    - The files are not modified
+    """
+
+    population = np.arange(1000) * 2
+    weights = np.arange(1000) % 5
+    np.save(tmp_path / "population.npy", population)
+    np.save(tmp_path / "weights.npy", weights)
+
+    urn = Urn(str(tmp_path / "population.npy"), replace=replace, weights=tmp_path / "weights.npy", rng=42)
+    drawn = urn.draw(100) + [next(urn)]
+    assert all(weights[element // 2] > 0 for element in drawn)
+    assert set(drawn).issubset(set(population))
+
+    if not replace:
+        assert len(set(drawn)) == len(drawn)
+        assert urn.size() == 1000 - len(drawn)
+        assert all(element not in urn for element in drawn)
+        urn.remove(0)
+        assert 0 not in urn
+        rest = list(urn)
+        assert sorted(drawn + rest + [0]) == sorted(population)
+
+    assert np.all(np.load(tmp_path / "weights.npy") == weights)
+    assert np.all(np.load(tmp_path / "population.npy") == population)
@@ -0,0 +1,49 @@
+from sampling.buckets import BucketedWeights
+import numpy as np
+import random
+import math
+import pytest
+
+
+def test_changes_match_reference():
+    """Test that:
+     - Updates, removals and appends give the same weights and sum as a plain list
+     - Every index is in the bucket of its weight
+    """
+
+    random.seed(42)
+    weights = [random.choice([0, 1e-3, 0.7, 1, 3, 1e6]) for _ in range(100)]
+    bucketed = BucketedWeights(weights)
+
+    for _ in range(1000):
+        operation = random.choice(["update", "remove", "extend"])
+        if operation == "update" and weights:
+            index, weight = random.randrange(len(weights)), random.expovariate(1) * random.choice([0, 1, 1e3])
+            weights[index] = weight
+            bucketed.update_weight(index, weight)
+        elif operation == "remove" and weights:
+            index = random.randrange(len(weights))
+            weights[index] = weights[-1]
+            weights.pop()
+            bucketed.remove(index)
+        else:
+            weights.append(random.random())
+            bucketed.extend(weights[-1:])
+
+    assert list(bucketed.weights) == weights
+    assert math.isclose(bucketed.get_sum(), sum(weights))
+    for bucket, indices in bucketed._buckets.items():
+        assert all(bucketed._bucket(weights[index]) == bucket for index in indices)
+    assert sum(len(indices) for indices in bucketed._buckets.values()) == sum(w > 0 for w in weights)
+
+
+@pytest.mark.parametrize("weights", [[1], [0, 1, 2, 3, 4, 5], [1e-6, 1, 1000, 0.3, 0.5, 0.75]])
+def test_query_frequencies(weights):
+    """Test that:
+     - Indices are drawn with probabilities proportional to their weights
+    """
+
+    bucketed = BucketedWeights(weights, rng=42)
+    search_weights = np.random.default_rng(0).random(100_000) * bucketed.get_sum()
+    frequencies = np.bincount(bucketed.query_many(search_weights), minlength=len(weights)) / len(search_weights)
+    assert np.allclose(frequencies, np.array(weights) / sum(weights), atol=0.01)
@@ -0,0 +1,69 @@
+from sampling import Urn
+from sampling.rng import make_rng
+from sampling.urns import _multivariate_hypergeometric
+import numpy as np
+import pytest
+
+BACKENDS = ("cumsum", "tree", "fenwick", "alias", "buckets")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_draws_exhaust_counts(backend):
+    """Test that:
+    - Draws, single or many at once, return every copy of every element exactly once
+    - Elements leave the urn when their last copy is drawn
+    """
+    counts = {"a": 3, "b": 1, "c": 5, "d": 0}
+    urn = Urn.from_counts(counts, backend=backend, rng=1)
+    assert urn.size() == 9 and "d" not in urn
+
+    drawn = urn.draw(2) + [next(urn)]
+    drawn_counts = urn.draw_counts(4)
+    assert sum(drawn_counts.values()) == 4 and urn.size() == 2
+    drawn += list(drawn_counts.elements()) + list(urn)
+    assert sorted(drawn) == sorted("aaabccccc")
+    assert urn.size() == 0 and "a" not in urn
+
+
+def test_large_counts_are_not_expanded():
+    urn = Urn.from_counts({"a": 10 ** 12, "b": 10 ** 6, "c": 1}, rng=1)
+    drawn = urn.draw_counts(10 ** 9)
+    assert sum(drawn.values()) == 10 ** 9
+    assert urn.size() == 10 ** 12 + 10 ** 6 + 1 - 10 ** 9
+    assert urn.count("a") == 10 ** 12 - drawn["a"]
+    assert len(urn.draw(1000)) == 1000
+
+    urn.add("d", 5)
+    urn.remove("a", 10 ** 12)
+    assert urn.count("d") == 5 and "a" not in urn
+
+
+@pytest.mark.parametrize("num_kinds", [1, 2, 5, 17])
+def test_multivariate_hypergeometric_means(num_kinds):
+    """Test that every count is on average size * count / total, and that counts never exceed the copies."""
+    rng = make_rng(42)
+    counts = np.arange(1, num_kinds + 1) * 3
+    size = min(10, counts.sum() - 1)
+    total = np.zeros(num_kinds)
+    for _ in range(2000):
+        drawn = _multivariate_hypergeometric(counts, size, rng)
+        assert drawn.sum() == size and np.all(drawn <= counts)
+        total += drawn
+    expected = counts * size / counts.sum()
+    assert np.allclose(total / 2000, expected, atol=0.1)
+
+
+def test_sequential_draw_frequencies():
+    """Test that the first draw picks an element with probability proportional to its count."""
+    firsts = {"a": 0, "b": 0}
+    for seed in range(2000):
+        firsts[Urn.from_counts({"a": 1, "b": 3}, rng=seed).draw(4)[0]] += 1
+    assert firsts["a"] / 2000 == pytest.approx(1 / 4, abs=0.03)
+
+
+def test_counts_cannot_be_scaled():
+    urn = Urn.from_counts({"a": 3, "b": 1})
+    with pytest.raises(TypeError):
+        urn.scale_weights(0.5)
+    with pytest.raises(TypeError):
+        urn.boost_weights(1)
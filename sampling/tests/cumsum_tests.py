@@ -6,7 +6,9 @@ Created on Sun Mar  8 14:40:33 2020
 @author: tommy
 """
 
+from sampling.alias import AliasTable
 from sampling.cumsum import CumulativeSum
+from sampling.tree import CumulativeSumTree
 import random
 import math
 import pytest
@@ -73,3 +75,27 @@ def test_scale_invariance_of_weights(scale):
             yield i
 
     assert list(sample_indices(1)) == list(sample_indices(scale))
+
+
+@pytest.mark.parametrize("structure", [CumulativeSum, CumulativeSumTree, AliasTable])
+@pytest.mark.parametrize("num_updates", [0, 1, 10, 1000])
+def test_update_weights(structure, num_updates):
+    """Test that:
+     - A bulk update gives the same weights and sum as updating one weight at a time
+    """
+
+    random.seed(42)
+    num_weights = 1000
+    weights = [random.random() for _ in range(num_weights)]
+    indices = [random.randrange(num_weights) for _ in range(num_updates)]
+    new_weights = [random.random() for _ in range(num_updates)]
+
+    one_at_a_time = structure(weights)
+    for index, weight in zip(indices, new_weights):
+        one_at_a_time.update_weight(index, weight)
+
+    bulk = structure(weights)
+    bulk.update_weights(indices, new_weights)
+
+    assert list(bulk.weights) == list(one_at_a_time.weights)
+    assert math.isclose(bulk.get_sum(), one_at_a_time.get_sum())
@@ -0,0 +1,78 @@
+from sampling.fenwick import FenwickTree
+import random
+import math
+import subprocess
+import sys
+import pytest
+import numpy as np
+
+
+@pytest.mark.parametrize("num_weights", [1, 10, 100, 1000])
+def test_query(num_weights):
+    """Test that:
+    - Queries agree with a search to the right of the NumPy cumulative sum
+    - Weights set to zero are never returned, also at the total sum
+    """
+
+    random.seed(42)
+    weights = [random.choice([0, random.random()]) for _ in range(num_weights)]
+    weights[0] = 0.5
+    tree = FenwickTree(weights)
+    cumulative_weights = np.cumsum(weights)
+    assert math.isclose(tree.get_sum(), cumulative_weights[-1])
+
+    search_weights = [0, tree.get_sum()] + [random.random() * tree.get_sum() for _ in range(1000)]
+    expected = np.searchsorted(cumulative_weights, search_weights, side="right")
+    last = max(i for i, weight in enumerate(weights) if weight > 0)
+    indices = tree.query_many(search_weights)
+    # Search weights within rounding of a boundary may land on either side
+    mismatches = [i for i, (a, b) in enumerate(zip(indices, np.minimum(expected, last))) if a != b]
+    assert len(mismatches) <= 2
+    assert all(weights[index] > 0 for index in indices)
+
+
+@pytest.mark.parametrize("num_weights", [0, 1, 2, 7, 100])
+def test_update_remove_and_extend(num_weights):
+    """Test that:
+    - Updates, removals (moving the last weight into the slot) and extensions keep the
+       weights and every prefix sum
+    """
+
+    random.seed(42)
+    weights = [random.random() for _ in range(num_weights)]
+    tree = FenwickTree(weights)
+
+    for _ in range(num_weights):
+        i = random.randrange(len(weights))
+        weights[i] = random.random()
+        tree.update_weight(i, weights[i])
+
+    for _ in range(num_weights // 2):
+        i = random.randrange(len(weights))
+        weights[i] = weights[-1]
+        weights.pop()
+        tree.remove(i)
+        assert len(tree) == len(weights)
+
+    more_weights = [random.random() for _ in range(num_weights + 3)]
+    weights.extend(more_weights)
+    tree.extend(more_weights)
+
+    assert tree.weights == weights
+    cumulative_weights = np.cumsum(weights)
+    assert all(math.isclose(tree._prefix_sum(i + 1), cumulative_weights[i]) for i in range(len(weights)))
+
+
+def test_no_numpy_import():
+    """Test that importing the package, unweighted urns and the Fenwick backend do not import NumPy."""
+    code = (
+        "import sys, sampling\n"
+        "from sampling.utils import permute\n"
+        "urn = sampling.Urn(range(100))\n"
+        "urn.draw(10), next(urn), sampling.Urn('abc', replace=True).draw(10)\n"
+        "sampling.sample(range(100), 5), permute([1, 2, 3])\n"
+        "urn = sampling.Urn('abc', weights=[1, 2, 3], backend='fenwick')\n"
+        "urn.draw(2), next(urn), sampling.Urn('abc', True, [1, 2, 3], backend='fenwick').draw(10)\n"
+        "assert 'numpy' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
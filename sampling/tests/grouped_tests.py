@@ -0,0 +1,60 @@
+from sampling import sample_grouped
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("replace", [False, True])
+@pytest.mark.parametrize("weighted", [False, True])
+def test_samples_come_from_their_groups(replace, weighted):
+    """Test that:
+    - Every group gets its number of samples, or all of its elements without replacement
+    - Samples come from their own group, and are distinct without replacement
+    - Elements with zero weight are never drawn with replacement
+    """
+    generator = np.random.default_rng(0)
+    group_ids = generator.integers(50, size=1000)
+    population = np.arange(1000)
+    weights = generator.random(1000) * (population % 5 != 0) if weighted else None
+    sizes = generator.integers(0, 40, size=50)
+
+    offsets, samples = sample_grouped(population, group_ids, sizes, weights=weights, replace=replace, rng=1)
+    counts = np.bincount(group_ids, minlength=50)
+    expected = sizes if replace else np.minimum(sizes, counts)
+    assert np.array_equal(np.diff(offsets), expected)
+    for group in range(50):
+        drawn = samples[offsets[group] : offsets[group + 1]]
+        assert np.all(group_ids[drawn] == group)
+        if not replace:
+            assert len(set(drawn.tolist())) == len(drawn)
+        elif weighted:
+            assert np.all(weights[drawn] > 0)
+
+
+@pytest.mark.parametrize("replace", [False, True])
+def test_weighted_frequencies(replace):
+    """Test that the first sample of every group is drawn proportionally to the weights."""
+    population = ["a", "b", "c", "d", "e"]
+    group_ids = [0, 0, 0, 1, 1]
+    weights = [1, 2, 3, 1, 3]
+    counts = {element: 0 for element in population}
+    for seed in range(3000):
+        offsets, samples = sample_grouped(population, group_ids, 2, weights=weights, replace=replace, rng=seed)
+        counts[samples[offsets[0]]] += 1
+        counts[samples[offsets[1]]] += 1
+    assert counts["a"] / 3000 == pytest.approx(1 / 6, abs=0.03)
+    assert counts["c"] / 3000 == pytest.approx(3 / 6, abs=0.03)
+    assert counts["e"] / 3000 == pytest.approx(3 / 4, abs=0.03)
+
+
+def test_groups_after_a_large_total():
+    """Test that draws with replacement from a group keep its weights after groups with a much larger total."""
+    offsets, samples = sample_grouped([0, 1, 2], [0, 1, 1], [1, 10000], weights=[1e17, 1, 3], replace=True, rng=1)
+    assert np.mean(samples[offsets[1] :] == 2) == pytest.approx(3 / 4, abs=0.02)
+
+
+def test_empty_groups():
+    offsets, samples = sample_grouped([1, 2], [0, 2], [3, 5, 1])
+    assert offsets.tolist() == [0, 1, 1, 2]
+    assert samples.tolist() == [1, 2]
+    with pytest.raises(ValueError):
+        sample_grouped([1, 2], [0, 2], [3, 5, 1], replace=True)
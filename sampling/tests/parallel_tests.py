@@ -0,0 +1,30 @@
+from sampling import sample_parallel
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("weights", [None, [0, 1, 2, 3, 0]])
+def test_deterministic_for_seed_and_workers(weights):
+    """Test that:
+    - The output only depends on the seed and the number of workers
+    """
+
+    data = "abcde"
+    for workers in [1, 2]:
+        samples = sample_parallel(data, size=1001, weights=weights, workers=workers, seed=42)
+        assert len(samples) == 1001
+        assert samples == sample_parallel(data, size=1001, weights=weights, workers=workers, seed=42)
+        assert samples != sample_parallel(data, size=1001, weights=weights, workers=workers, seed=43)
+
+
+def test_frequencies():
+    """Test that:
+    - Elements are drawn with probabilities proportional to their weights
+    - Elements with zero weight are never drawn
+    """
+
+    weights = np.array([0, 1, 2, 3, 0])
+    samples = sample_parallel(range(5), size=100_000, weights=weights, workers=3, seed=1)
+    frequencies = np.bincount(samples, minlength=5) / len(samples)
+    assert np.allclose(frequencies, weights / weights.sum(), atol=0.01)
+    assert frequencies[0] == frequencies[4] == 0
@@ -0,0 +1,72 @@
+from sampling.reservoir import reservoir_sample
+from sampling import sample
+import numpy as np
+import random
+import pytest
+
+
+def chunked(array, chunk_size):
+    for i in range(0, len(array), chunk_size):
+        yield array[i : i + chunk_size]
+
+
+@pytest.mark.parametrize("num_elements, size", [(0, 3), (2, 3), (3, 3), (100, 10)])
+def test_size(num_elements, size):
+    """Test that:
+     - The reservoir holds `size` unique elements, or the whole stream if it is shorter
+    """
+
+    random.seed(42)
+    for weights in [None, lambda x: x + 1]:
+        samples = reservoir_sample(iter(range(num_elements)), size=size, weights=weights)
+        assert len(samples) == len(set(samples)) == min(size, num_elements)
+        assert set(samples).issubset(set(range(num_elements)))
+
+        chunks = chunked(np.arange(num_elements), 7)
+        samples = reservoir_sample(chunks, size=size, weights=weights)
+        assert len(samples) == len(set(samples)) == min(size, num_elements)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 3, 50])
+def test_unweighted_inclusion_frequencies(chunk_size):
+    """Test that:
+     - Every element of the stream is equally likely to be in the reservoir
+    """
+
+    random.seed(42)
+    counts = np.zeros(20)
+    for _ in range(4000):
+        stream = iter(range(20)) if chunk_size is None else chunked(np.arange(20), chunk_size)
+        counts[reservoir_sample(stream, size=5)] += 1
+    assert np.allclose(counts / 4000, 5 / 20, atol=0.04)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 1, 3, 50])
+def test_weighted_first_sample(chunk_size):
+    """Test that:
+     - The first element of the weighted reservoir is distributed like a single weighted draw
+     - Zero-weight elements are never sampled ahead of positive-weight elements
+    """
+
+    random.seed(42)
+    weights = np.array([0, 1, 2, 3, 4, 0, 5, 6, 7, 8, 9, 10], dtype=float)
+    counts = np.zeros(len(weights))
+    for _ in range(4000):
+        if chunk_size is None:
+            samples = reservoir_sample(iter(range(len(weights))), size=3, weights=iter(weights))
+        else:
+            stream = chunked(np.arange(len(weights)), chunk_size)
+            samples = reservoir_sample(stream, size=3, weights=chunked(weights, chunk_size))
+        assert 0 not in samples and 5 not in samples
+        counts[samples[0]] += 1
+    assert np.allclose(counts / 4000, weights / weights.sum(), atol=0.03)
+
+
+def test_sample_with_generator():
+    """Test that sample() accepts generators, with and without replacement."""
+    samples = sample((i for i in range(100)), size=5)
+    assert len(set(samples)) == 5
+    samples = sample((i for i in range(100)), size=5, weights=lambda x: x)
+    assert len(set(samples)) == 5 and 0 not in samples
+    samples = sample((i for i in range(3)), size=5, replace=True)
+    assert len(samples) == 5
@@ -0,0 +1,33 @@
+from sampling.rng import make_rng, BufferedRandom, GlobalRandom
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("buffer_size", [1, 3, 1024])
+def test_buffered_uniforms_follow_generator(buffer_size):
+    """Test that:
+    - Single uniforms are consumed from the generator's stream, in order
+    """
+
+    rng = make_rng(np.random.default_rng(42), buffer_size=buffer_size)
+    uniforms = [rng.random() for _ in range(10)]
+    assert uniforms == np.random.default_rng(42).random(10).tolist()
+
+
+def test_make_rng():
+    """Test that:
+    - Seeds and generators give buffered sources, and None gives the global source
+    - Existing sources pass through unchanged
+    """
+
+    assert isinstance(make_rng(None), GlobalRandom)
+    assert isinstance(make_rng(42), BufferedRandom)
+    assert isinstance(make_rng(np.random.SeedSequence(42)), BufferedRandom)
+    rng = make_rng(42)
+    assert make_rng(rng) is rng
+    assert make_rng(42).random() == make_rng(42).random()
+
+    with pytest.raises(TypeError):
+        make_rng(1.5)
+    with pytest.raises(ValueError):
+        make_rng(42, buffer_size=0)
@@ -0,0 +1,113 @@
+from sampling import Urn
+import numpy as np
+import pickle
+import pytest
+
+BACKENDS = ("cumsum", "tree", "fenwick", "alias", "buckets")
+
+
+def _urns(tmp_path):
+    population = list(range(100))
+    weights = [i % 7 + 1 for i in range(100)]
+    np.save(tmp_path / "population.npy", np.arange(100))
+    np.save(tmp_path / "weights.npy", np.array(weights, dtype=float))
+
+    for backend in BACKENDS:
+        yield Urn(population, replace=False, weights=weights, backend=backend, rng=1)
+        yield Urn(population, replace=True, weights=weights, backend=backend, rng=1)
+    yield Urn(population, replace=False, rng=1)
+    yield Urn(range(10 ** 12), replace=False, rng=1)
+    yield Urn(population, replace=True, rng=1)
+    for replace in (False, True):
+        yield Urn(tmp_path / "population.npy", replace=replace, weights=tmp_path / "weights.npy", rng=1)
+
+
+@pytest.mark.parametrize("index", range(2 * len(BACKENDS) + 5))
+def test_save_and_load(tmp_path, index):
+    """Test that:
+    - A loaded urn has the size and elements of the saved one
+    - Urns loaded from the same file draw the same elements
+    - Loading does not modify the file, even when the loaded urn is changed
+    """
+    urn = list(_urns(tmp_path))[index]
+    urn.draw(5)
+    urn.save(tmp_path / "urn")
+    saved = (tmp_path / "urn").read_bytes()
+
+    loaded, again = Urn.load(tmp_path / "urn"), Urn.load(tmp_path / "urn")
+    assert type(loaded) is type(urn)
+    assert loaded.size() == urn.size()
+    assert all((element in loaded) == (element in urn) for element in range(100))
+    assert loaded.draw(20) == again.draw(20)
+    assert (tmp_path / "urn").read_bytes() == saved
+
+
+def test_save_and_load_before_protocol_5(tmp_path, monkeypatch):
+    """Test that urns are saved with their arrays in-band on Pythons without pickle protocol 5,
+    which then fail clearly to load files with out-of-band arrays."""
+    urn = Urn(list(range(100)), replace=False, weights=np.arange(1, 101), backend="tree", rng=1)
+    urn.save(tmp_path / "new")
+    monkeypatch.setattr(pickle, "HIGHEST_PROTOCOL", 4)
+    urn.save(tmp_path / "old")
+    loaded = Urn.load(tmp_path / "old")
+    assert loaded.size() == 100 and loaded.draw(20) == urn.draw(20)
+    with pytest.raises(ValueError):
+        Urn.load(tmp_path / "new")
+
+
+def test_arrays_are_mapped(tmp_path):
+    """Test that the arrays of a loaded urn are read from the file, not copied into memory."""
+    urn = Urn(list(range(1000)), replace=True, weights=np.arange(1, 1001), backend="tree")
+    urn.save(tmp_path / "urn")
+    loaded = Urn.load(tmp_path / "urn")
+
+    bst = loaded._cumulative_sum_object.bst
+    assert not bst.flags.owndata
+    assert np.array_equal(bst, urn._cumulative_sum_object.bst)
+
+
+def test_pickle_with_buffered_rng():
+    """Test that urns with a buffered random source can be pickled, and then draw deterministically."""
+    urn = Urn(list(range(100)), replace=False, weights=[1] * 100, rng=np.random.default_rng(42))
+    urn.draw(5)
+    first, second = pickle.loads(pickle.dumps(urn)), pickle.loads(pickle.dumps(urn))
+    assert first.draw(50) == second.draw(50)
+    assert first.size() == 45
+
+
+def test_load_rejects_other_files(tmp_path):
+    (tmp_path / "other").write_bytes(b"not an urn")
+    with pytest.raises(ValueError):
+        Urn.load(tmp_path / "other")
+
+
+def test_slots_are_built_lazily(tmp_path):
+    """Test that:
+    - Loading a weighted urn does not rebuild the slots of its elements, nor do draws
+    - Lookups by element after draws build them, in agreement with the population
+    """
+    urn = Urn(list(range(100)), replace=False, weights=[i % 7 + 1 for i in range(100)], backend="tree", rng=1)
+    urn.save(tmp_path / "urn")
+    loaded = Urn.load(tmp_path / "urn")
+    drawn = loaded.draw(10) + [next(loaded)]
+    assert "_positions" not in loaded.__dict__
+
+    clone = loaded.copy()
+    remaining = [element for element in range(100) if element not in drawn]
+    assert not any(element in loaded for element in drawn)
+    loaded.remove(remaining[0])
+    assert sorted(loaded.draw(100)) == remaining[1:]
+    assert sorted(clone.draw(100)) == remaining
+
+
+def test_memmap_population_is_not_copied(tmp_path):
+    """Test that an unweighted urn over a memory-mapped population saves a reference to its file."""
+    np.save(tmp_path / "population.npy", np.arange(10 ** 5))
+    urn = Urn(np.load(tmp_path / "population.npy", mmap_mode="r"), replace=False, copy=False, rng=1)
+    urn.draw(5)
+    urn.save(tmp_path / "urn")
+    assert (tmp_path / "urn").stat().st_size < 10 ** 4
+
+    loaded = Urn.load(tmp_path / "urn")
+    assert isinstance(loaded._population, np.memmap)
+    assert loaded.size() == urn.size() and loaded.draw(10) == Urn.load(tmp_path / "urn").draw(10)
@@ -0,0 +1,79 @@
+from sampling import Urn
+from sampling.urns import WeightedFiniteUrn
+import numpy as np
+import pickle
+import pytest
+
+BACKENDS = ("cumsum", "tree", "fenwick", "alias", "buckets")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_counts_operations(backend):
+    """Test that:
+    - Building, draws, removals and weight updates are counted, with the elements they touch
+    - Operations of the urn are counted once, however many operations of the structure they perform
+    - The callback sees every recorded operation
+    """
+    events = []
+    urn = Urn(list(range(100)), weights=[1] * 100, backend=backend, stats=lambda *event: events.append(event))
+    urn.draw(10)
+    next(urn)
+    urn.remove(urn._population[0])
+    urn.update_weights([0, 1, 2], [2, 2, 2])
+
+    stats = urn.stats()
+    assert stats["urn.build"]["calls"] == 1 and stats["urn.build"]["elements"] == 100
+    assert stats["urn.draw"] == {"calls": 1, "elements": 10, "seconds": stats["urn.draw"]["seconds"]}
+    assert stats["urn.next"]["calls"] == stats["urn.remove"]["calls"] == 1
+    assert stats["urn.update_weights"]["elements"] == 3
+    assert stats["structure.update_weights"]["elements"] == 3
+    assert all(value["seconds"] >= 0 for value in stats.values())
+    assert sum(1 for operation, _, _ in events if operation.startswith("urn.")) == 5
+    if backend == "cumsum":
+        # Every change recomputes the cumulative sum
+        assert stats["structure.rebuild"]["calls"] >= 4
+
+
+def test_disabled_by_default():
+    """Test that urns without stats run their original classes, also after disabling stats."""
+    urn = Urn([1, 2, 3], weights=[1, 2, 3])
+    assert urn.stats() is None and type(urn) is WeightedFiniteUrn
+
+    urn.enable_stats()
+    assert next(urn) in (1, 2, 3)
+    assert urn.stats()["urn.next"]["calls"] == 1
+    urn.disable_stats()
+    assert urn.stats() is None and type(urn) is WeightedFiniteUrn
+    assert type(urn._cumulative_sum_object).__name__ == "CumulativeSum"
+
+
+@pytest.mark.parametrize("weights", [None, [1, 2, 3, 4]])
+def test_copies_start_without_stats(weights):
+    urn = Urn([1, 2, 3, 4], weights=weights, stats=True)
+    urn.draw(2)
+    for clone in (urn.copy(), pickle.loads(pickle.dumps(urn))):
+        assert clone.stats() is None
+        assert sorted(clone.draw(2)) == sorted(element for element in [1, 2, 3, 4] if element in urn)
+    assert urn.stats()["urn.draw"]["calls"] == 1
+
+
+@pytest.mark.parametrize("kind", ["weighted", "counts", "indices"])
+def test_counts_draw_counts(kind):
+    """Test that draws of counts are recorded with the number of elements drawn, for every kind of urn."""
+    if kind == "counts":
+        urn = Urn.from_counts({"a": 10, "b": 5})
+        urn.enable_stats()
+    else:
+        urn = Urn(list(range(100)), replace=True, weights=[1] * 100, stats=True, return_indices=kind == "indices")
+    counts = urn.draw_counts(12)
+    assert sum(counts.values()) == 12 if kind != "indices" else counts.sum() == 12
+    assert urn.stats()["urn.draw_counts"]["calls"] == 1 and urn.stats()["urn.draw_counts"]["elements"] == 12
+
+
+@pytest.mark.parametrize("replace", [False, True])
+def test_build_of_memmap_urn(tmp_path, replace):
+    """Test that building an urn from files records the number of elements, not the length of the path."""
+    np.save(tmp_path / "population.npy", np.arange(100))
+    np.save(tmp_path / "weights.npy", np.ones(100))
+    urn = Urn(str(tmp_path / "population.npy"), replace=replace, weights=str(tmp_path / "weights.npy"), stats=True)
+    assert urn.stats()["urn.build"]["elements"] == 100
@@ -0,0 +1,144 @@
+from sampling import LockedUrn, PrefetchingUrn, Urn
+import asyncio
+import threading
+import time
+import pytest
+
+
+def _drain_from_threads(urn, num_threads=8):
+    drawn = []
+
+    def consume():
+        for element in urn:
+            drawn.append(element)
+
+    threads = [threading.Thread(target=consume) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return drawn
+
+
+@pytest.mark.parametrize("wrapper", [LockedUrn, lambda urn: PrefetchingUrn(urn, batch_size=7, max_batches=2)])
+@pytest.mark.parametrize("backend", ["cumsum", "tree"])
+def test_concurrent_draws(wrapper, backend):
+    """Test that consumers on several threads draw every element exactly once."""
+    data = list(range(2000))
+    urn = wrapper(Urn(data, weights=[1 + i % 3 for i in data], backend=backend))
+    assert sorted(_drain_from_threads(urn)) == data
+    assert not urn
+
+
+def test_methods_are_forwarded():
+    urn = LockedUrn(Urn([1, 2, 3], weights=[1, 2, 3]))
+    urn.update_element_weight(1, 0.5)
+    urn.remove(2)
+    assert 2 not in urn and urn.size() == 2
+    assert sorted(urn.draw(5)) == [1, 3]
+
+
+@pytest.mark.parametrize("wrapper", [LockedUrn, lambda urn: PrefetchingUrn(urn, batch_size=16)])
+def test_async_iteration(wrapper):
+    """Test that several tasks may draw from the same urn with async for."""
+    urn = wrapper(Urn(list(range(500)), weights=[1] * 500))
+
+    async def consume(drawn):
+        async for element in urn:
+            drawn.append(element)
+            await asyncio.sleep(0)
+
+    async def main():
+        drawn = []
+        await asyncio.gather(*(consume(drawn) for _ in range(4)))
+        return drawn
+
+    assert sorted(asyncio.run(main())) == list(range(500))
+
+
+def test_prefetching_infinite_urn():
+    """Test that prefetching stops when closed, and that errors of draws reach the consumer."""
+    with PrefetchingUrn(Urn([1, 2, 3], replace=True), batch_size=10) as urn:
+        assert set(urn.draw(1000)) == {1, 2, 3}
+    assert list(urn) == []
+
+    urn = PrefetchingUrn(Urn([], replace=True))
+    with pytest.raises(Exception):
+        next(urn)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 64])
+def test_prefetched_elements_are_counted(batch_size):
+    """Test that elements drawn ahead of time count towards size() and bool(), so that draining with a while loop
+    gets every element."""
+    urn = PrefetchingUrn(Urn(list(range(10))), batch_size=batch_size)
+    assert urn.size() == 10
+    drawn = []
+    while urn:
+        drawn.append(next(urn))
+        assert urn.size() == 10 - len(drawn)
+    assert sorted(drawn) == list(range(10))
+    assert list(urn) == []
+
+
+def test_prefetching_index_urn():
+    """Test that index urns, whose draws are arrays, can be prefetched."""
+    with PrefetchingUrn(Urn(list(range(100)), weights=[1] * 100, return_indices=True), batch_size=8) as urn:
+        assert sorted(int(position) for position in urn) == list(range(100))
+    with PrefetchingUrn(Urn(list(range(100)), replace=True, return_indices=True), batch_size=8) as urn:
+        assert all(0 <= position < 100 for position in urn.draw(50))
+
+
+class _BlockingUrn:
+    """An infinite urn whose draws wait for an event, once `num_fast_draws` draws have returned."""
+
+    def __init__(self, num_fast_draws):
+        self.num_fast_draws = num_fast_draws
+        self.event = threading.Event()
+
+    def draw(self, size):
+        if self.num_fast_draws == 0:
+            self.event.wait()
+        self.num_fast_draws = max(self.num_fast_draws - 1, 0)
+        return [0] * size
+
+    def size(self):
+        return float("inf")
+
+
+def _run_with_timeout(function, timeout=2):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result
+
+
+def test_consumers_do_not_wait_for_background_draws():
+    """Test that queued elements are consumed while a background draw is running, also with async for."""
+    urn = PrefetchingUrn(_BlockingUrn(num_fast_draws=2), batch_size=2)
+    while urn._batches.qsize() < 2:
+        time.sleep(0.01)
+    assert _run_with_timeout(lambda: next(urn)) == [0]
+
+    async def first():
+        async for element in urn:
+            return element
+
+    assert _run_with_timeout(lambda: asyncio.run(first())) == [0]
+    urn.urn.event.set()
+    urn.close()
+
+
+def test_close_wakes_up_waiting_consumers():
+    """Test that closing ends the iteration of a consumer waiting for a batch, instead of hanging."""
+    urn = PrefetchingUrn(_BlockingUrn(num_fast_draws=0), batch_size=2)
+    consumer = threading.Thread(target=lambda: list(urn), daemon=True)
+    consumer.start()
+    time.sleep(0.05)
+    closer = threading.Thread(target=urn.close, daemon=True)
+    closer.start()
+    urn.urn.event.set()
+    closer.join(2)
+    consumer.join(2)
+    assert not closer.is_alive() and not consumer.is_alive()
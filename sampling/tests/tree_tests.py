@@ -2,6 +2,7 @@ from sampling.tree import CumulativeSumTree
 import random
 import math
 import pytest
+import numpy as np
 
 
 @pytest.mark.parametrize("num_weights", [10, 100, 1000])
@@ -65,3 +66,65 @@ def test_scale_invariance_of_weights(scale):
             yield i
 
     assert list(sample_indices(1)) == list(sample_indices(scale))
+
+
+@pytest.mark.parametrize("num_weights", [0, 1, 2, 7, 100])
+def test_remove_and_extend(num_weights):
+    """Test that:
+     - Removing moves the last weight into the removed slot
+     - Extending beyond the capacity of the tree keeps the weights and the sum
+    """
+
+    random.seed(42)
+    weights = [random.random() for _ in range(num_weights)]
+    tree = CumulativeSumTree(weights)
+
+    for _ in range(num_weights // 2):
+        i = random.randrange(len(weights))
+        weights[i] = weights[-1]
+        weights.pop()
+        tree.remove(i)
+        assert len(tree) == len(weights)
+
+    more_weights = [random.random() for _ in range(num_weights + 3)]
+    weights.extend(more_weights)
+    tree.extend(more_weights)
+
+    assert len(tree) == len(weights)
+    assert list(tree.weights) == weights
+    assert math.isclose(tree.get_sum(), sum(weights))
+
+
+@pytest.mark.parametrize("num_weights", [1, 10, 1000])
+def test_query_many(num_weights):
+    """Test that:
+     - Vectorized queries agree with single queries, also at the boundaries
+    """
+
+    random.seed(42)
+    weights = [random.random() for _ in range(num_weights)]
+    weights[0] = 0
+    tree = CumulativeSumTree(weights)
+    search_weights = [0, tree.get_sum()] + [random.random() * tree.get_sum() for _ in range(1000)]
+    indices = tree.query_many(search_weights)
+    assert isinstance(indices, np.ndarray)
+    assert list(indices) == [tree.query(w) for w in search_weights]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_queries_at_the_ends_return_positive_weights(seed):
+    """Test that:
+     - Queries at 0, at the total sum and just below it return an index with a positive weight,
+        also when rounding reaches trailing zero weights or the padding of the tree
+    """
+
+    generator = np.random.default_rng(seed)
+    for _ in range(50):
+        weights = generator.random(generator.integers(1, 50)) * generator.choice([1e-3, 1, 1e6])
+        weights[generator.random(len(weights)) < 0.3] = 0
+        weights[generator.integers(len(weights))] = 1
+        tree = CumulativeSumTree(weights)
+        search_weights = [0, tree.get_sum(), np.nextafter(tree.get_sum(), 0)]
+        indices = [tree.query(w) for w in search_weights]
+        assert list(tree.query_many(search_weights)) == indices
+        assert all(weights[i] > 0 for i in indices)
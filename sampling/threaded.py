@@ -0,0 +1,219 @@
+"""
+Urns shared between threads, and iterated from asyncio.
+
+The urns are not thread-safe: a draw changes the population and the weight
+structure in several steps. `LockedUrn` serializes every call to an urn with a lock.
+`PrefetchingUrn` also draws from the urn in batches on a background thread, into a
+bounded queue, so that consumers get elements without waiting for a draw, such as
+one triggering an O(n) rebuild of a cumulative sum.
+
+Both may be iterated with `async for`. Elements are then fetched in the default
+executor, whenever they are not ready at once, so the event loop never blocks.
+"""
+
+import functools
+import itertools
+import queue
+import threading
+from collections.abc import Iterator
+
+# Markers returned by `_next`, for an exhausted urn, and for no element being ready
+_END = object()
+_EMPTY = object()
+
+
+class LockedUrn(Iterator):
+    """A thread-safe view of an urn, whose every method call holds a lock.
+
+    Methods which are not defined here are forwarded to the urn, under the lock.
+    """
+
+    def __init__(self, urn):
+        self.urn = urn
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.urn!r})"
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            # Special methods are looked up before the urn is set, for instance by copy
+            raise AttributeError(name)
+        attribute = getattr(self.urn, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+
+        return locked
+
+    def __iter__(self):
+        return self
+
+    def __contains__(self, value):
+        with self._lock:
+            return value in self.urn
+
+    def __bool__(self):
+        with self._lock:
+            return bool(self.urn)
+
+    def _next(self, block=True):
+        """Return the next element, or _END if the urn is exhausted.
+
+        If `block` is False, return _EMPTY instead of waiting, including for a draw.
+        """
+        if not block:
+            return _EMPTY
+        with self._lock:
+            return next(self.urn, _END)
+
+    def __next__(self):
+        element = self._next()
+        if element is _END:
+            raise StopIteration
+        return element
+
+    def draw(self, size):
+        with self._lock:
+            return self.urn.draw(size)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        element = self._next(block=False)
+        if element is _EMPTY:
+            # Imported here, as asyncio takes longer to import than the rest of the package
+            import asyncio
+
+            element = await asyncio.get_running_loop().run_in_executor(None, self._next)
+        if element is _END:
+            raise StopAsyncIteration
+        return element
+
+
+class PrefetchingUrn(LockedUrn):
+    """A thread-safe view of an urn, which draws batches of elements on a background thread.
+
+    Up to `max_batches` batches of `batch_size` elements are drawn ahead of time. The
+    elements in the queue are already drawn from the urn, so they cannot be removed, but
+    they are counted by `size()` and `bool()`. Call `close()`, or use the urn in a with statement,
+    to stop the thread, discarding the elements in the queue.
+    """
+
+    def __init__(self, urn, batch_size=1024, max_batches=4):
+        if batch_size < 1 or max_batches < 1:
+            raise ValueError("'batch_size' and 'max_batches' must be positive integers")
+        super().__init__(urn)
+        self.batch_size = batch_size
+        self._batches = queue.Queue(maxsize=max_batches)
+        self._batch = iter(())  # The rest of the batch being consumed
+        # The number of elements drawn from the urn, but not yet consumed. It has a lock of its
+        # own, as consumers must never wait for the urn lock, held during background draws.
+        self._queued = 0
+        self._queued_lock = threading.Lock()
+        self._consumer_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._fill, daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        # Wait for room in the queue, unless the urn is closed meanwhile
+        while not self._closed.is_set():
+            try:
+                self._batches.put(item, timeout=0.05)
+                return
+            except queue.Full:
+                pass
+
+    def _fill(self):
+        try:
+            while not self._closed.is_set():
+                with self._lock:
+                    batch = self.urn.draw(self.batch_size)
+                    with self._queued_lock:
+                        self._queued += len(batch)
+                if len(batch):
+                    self._put(batch)
+                if len(batch) < self.batch_size:
+                    break
+        except Exception as error:
+            # Raised to the consumer instead
+            self._put(error)
+        self._put(_END)
+
+    def _next(self, block=True):
+        if not self._consumer_lock.acquire(blocking=block):
+            return _EMPTY
+        try:
+            for element in self._batch:
+                return self._consumed(element)
+            while True:
+                try:
+                    batch = self._batches.get(block=block)
+                except queue.Empty:
+                    return _EMPTY
+                if batch is _END:
+                    # Leave the marker for other consumers
+                    self._batches.put(_END)
+                    return _END
+                if isinstance(batch, Exception):
+                    raise batch
+                self._batch = iter(batch)
+                for element in self._batch:
+                    return self._consumed(element)
+        finally:
+            self._consumer_lock.release()
+
+    def _consumed(self, element):
+        with self._queued_lock:
+            self._queued -= 1
+        return element
+
+    def __bool__(self):
+        with self._queued_lock:
+            if self._queued > 0:
+                return True
+        with self._lock:
+            return bool(self.urn)
+
+    def size(self):
+        """The number of elements left, including those drawn ahead of time but not yet consumed."""
+        with self._lock, self._queued_lock:
+            return self.urn.size() + self._queued
+
+    def draw(self, size):
+        """Draw `size` elements at once, or all remaining elements if fewer are left."""
+        return list(itertools.islice(self, size))
+
+    def close(self):
+        """Stop the background thread, discarding the elements drawn ahead of time."""
+        self._closed.set()
+        self._thread.join()
+        # The thread stops without putting the end marker, so put it here, to wake up a
+        # consumer waiting on the queue. The queue is only full if no consumer is waiting.
+        while True:
+            try:
+                self._batches.put_nowait(_END)
+                break
+            except queue.Full:
+                try:
+                    self._batches.get_nowait()
+                except queue.Empty:
+                    pass
+        with self._consumer_lock:
+            self._batch = iter(())
+            self._batches = queue.Queue()
+            self._batches.put(_END)
+            with self._queued_lock:
+                self._queued = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
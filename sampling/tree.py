@@ -1,37 +1,52 @@
 import math
+from sampling.lazy import np
 
 
 class CumulativeSumTree:
+    """A binary tree of partial sums supporting O(log n) queries, updates, removals and appends.
+
+    The leaves hold the weights, and every internal node stores the sum of its left
+    subtree in `bst` and the sum of its right subtree in `right_sums`. The number of
+    leaves is a power of two, and unused leaves carry a weight of zero. Both are NumPy
+    arrays, so the tree is built one level at a time, and `query_many` resolves many
+    queries in O(log n) vectorized steps.
+    """
+
+    # Changes cost O(log n)
+    dynamic = True
+
     def __init__(self, weights):
-        assert isinstance(weights, list)
-        assert all(w >= 0 for w in weights)
+        weights = np.asarray(weights, dtype=float)
+        assert np.all(weights >= 0)
+        self._build(weights, self._capacity(len(weights)))
 
-        self.leaf_nodes = int(2 ** math.ceil(math.log(len(weights), 2)))
-        self.bst = [0] * self.leaf_nodes
-        self.bst.extend(weights)
-        self.bst.extend((self.leaf_nodes - len(weights)) * [0])
-        self.right_sums = [0] * self.leaf_nodes
+    def _build(self, weights, leaf_nodes):
+        self._size = len(weights)
+        self.leaf_nodes = leaf_nodes
+        self._depth = int(math.log2(leaf_nodes))
 
+        # Leaves carry no right sums, which lets every level be computed the same way
+        self.bst = np.zeros(2 * self.leaf_nodes)
+        self.bst[self.leaf_nodes : self.leaf_nodes + self._size] = weights
+        self.right_sums = np.zeros(2 * self.leaf_nodes)
+
+        # Set the sums of a whole level at a time, from the level below it
         nodes_in_level = self.leaf_nodes // 2
         while nodes_in_level > 0:
-            # loop over every node at this level in the tree
-            for i in range(nodes_in_level, nodes_in_level * 2):
-
-                # Get indices of children
-                left_child_index = self._left_child(i)
-                right_child_index = self._right_child(i)
-
-                # recursively set the sums
-                if self._is_leaf(left_child_index):
-                    self.bst[i] = self.bst[left_child_index]
-                    self.right_sums[i] = self.bst[right_child_index]
-                else:
-                    self.bst[i] = self.bst[left_child_index] + self.right_sums[left_child_index]
-                    self.right_sums[i] = self.bst[right_child_index] + self.right_sums[right_child_index]
+            children = slice(2 * nodes_in_level, 4 * nodes_in_level, 2)
+            right_children = slice(2 * nodes_in_level + 1, 4 * nodes_in_level, 2)
+            level = slice(nodes_in_level, 2 * nodes_in_level)
+            self.bst[level] = self.bst[children] + self.right_sums[children]
+            self.right_sums[level] = self.bst[right_children] + self.right_sums[right_children]
 
             # go up one level in the tree
             nodes_in_level = nodes_in_level // 2
 
+    @staticmethod
+    def _capacity(num_weights):
+        # At least two leaves, so that the root is an internal node
+        return int(2 ** math.ceil(math.log(max(num_weights, 2), 2)))
+
     def _is_leaf(self, i):
         return i >= self.leaf_nodes
 
@@ -44,12 +59,20 @@ class CumulativeSumTree:
     def _parent(self, i):
         return i // 2
 
+    def __len__(self):
+        return self._size
+
+    @property
+    def weights(self):
+        return self.bst[self.leaf_nodes : self.leaf_nodes + self._size]
+
     def get_sum(self):
-        return self.bst[1] + self.right_sums[1]
+        return float(self.bst[1] + self.right_sums[1])
 
     def query(self, search_weight):
         assert 0 <= search_weight <= self.get_sum()
 
+        original_weight = search_weight
         current_index = 1
 
         while not self._is_leaf(current_index):
@@ -62,25 +85,47 @@ class CumulativeSumTree:
                 search_weight -= self.bst[current_index]
                 current_index = self._right_child(current_index)
 
+        if self.bst[current_index] == 0:
+            # Rounding reached a weight of zero, or the padding past the end of the weights
+            return int(self._search_positive(np.array([original_weight]))[0])
         return current_index - self.leaf_nodes
 
+    def query_many(self, search_weights):
+        """Query every search weight at once, walking down the tree one level per vectorized step."""
+        search_weights = np.array(search_weights, dtype=float)
+        assert np.all((0 <= search_weights) & (search_weights <= self.get_sum()))
+
+        original_weights = search_weights.copy()
+        indices = np.ones(len(search_weights), dtype=np.intp)
+        for _ in range(self._depth):
+            left_sums = self.bst[indices]
+            go_right = search_weights > left_sums
+            search_weights -= np.where(go_right, left_sums, 0)
+            indices = 2 * indices + go_right
+
+        zero = self.bst[indices] == 0
+        indices -= self.leaf_nodes
+        if np.any(zero):
+            indices[zero] = self._search_positive(original_weights[zero])
+        return indices
+
+    def _search_positive(self, search_weights):
+        """Search the positive weights only, in O(n), for the rare queries which rounding sends to a zero weight."""
+        positive = np.flatnonzero(self.weights)
+        if len(positive) == 0:
+            return np.full(len(search_weights), max(self._size - 1, 0), dtype=np.intp)
+        cumulative_weights = np.cumsum(self.weights[positive])
+        found = np.searchsorted(cumulative_weights, search_weights, side="left")
+        return positive[np.minimum(found, len(positive) - 1)]
+
     def update_weight(self, index, weight):
         # Set leaf to new weight
         index = index + self.leaf_nodes
         self.bst[index] = weight
 
-        # Set parent left and right sums
+        # Set parent left and right sums, leaves having no right sums
         prev = index
         curr = self._parent(prev)
-
-        # Parent of a left child
-        if prev % 2 == 0:
-            self.bst[curr] = weight
-        else:
-            self.right_sums[curr] = weight
-
-        # Move one tree level up
-        curr, prev = self._parent(curr), curr
         while curr >= 1:
             # We came from the left
             if prev % 2 == 0:
@@ -91,5 +136,47 @@ class CumulativeSumTree:
             # Move one tree level up
             curr, prev = self._parent(curr), curr
 
+    def update_weights(self, indices, weights):
+        """Set the weights at `indices`, as point updates or by rebuilding the tree, whichever is cheaper."""
+        indices = np.asarray(indices, dtype=np.intp)
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), indices.shape)
+
+        # A point update visits O(log n) nodes in Python, which is far slower per node
+        # than the vectorized rebuild visiting all O(n) nodes
+        if len(indices) * self._depth * 32 < self.leaf_nodes:
+            for index, weight in zip(indices.tolist(), weights.tolist()):
+                self.update_weight(index, weight)
+        else:
+            all_weights = self.weights.copy()
+            all_weights[indices] = weights
+            self._build(all_weights, self.leaf_nodes)
+
     def __getitem__(self, index):
         return self.bst[self.leaf_nodes + index]
+
+    def remove(self, index):
+        """Remove the weight at `index` by moving the last weight into its slot."""
+        last = self._size - 1
+        if index != last:
+            self.update_weight(index, self[last])
+        self.update_weight(last, 0)
+        self._size -= 1
+
+    def remove_many(self, indices):
+        """Remove the weights at `indices`, given in decreasing order, as if calling `remove` on each."""
+        for index in indices:
+            self.remove(index)
+
+    def extend(self, weights):
+        weights = np.asarray(weights, dtype=float)
+        assert np.all(weights >= 0)
+
+        # Grow the tree by (at least) doubling it, so that appends are amortized O(log n)
+        if self._size + len(weights) > self.leaf_nodes:
+            all_weights = np.concatenate([self.weights, weights])
+            self._build(all_weights, self._capacity(max(len(all_weights), 2 * self.leaf_nodes)))
+            return
+
+        for i, weight in enumerate(weights.tolist(), self._size):
+            self.update_weight(i, weight)
+        self._size += len(weights)
@@ -1,24 +1,175 @@
-import random
+import copy
+import collections
+import itertools
 import math
+import os
+import time
+from sampling.alias import AliasTable
+from sampling.blocked import BlockedCumulativeSum, _dump_array, _load_array as _load_dumped_array
+from sampling.buckets import BucketedWeights
 from sampling.cumsum import CumulativeSum
+from sampling.fenwick import FenwickTree
+from sampling.rng import make_rng
+from sampling import snapshot, stats as instrumentation
+from sampling.tree import CumulativeSumTree
 import numbers
-from collections.abc import Iterator, Hashable
+from sampling.lazy import is_numpy_instance, np
+from collections.abc import Iterator
 
+_BACKENDS = {
+    "cumsum": CumulativeSum,
+    "tree": CumulativeSumTree,
+    "fenwick": FenwickTree,
+    "alias": AliasTable,
+    "buckets": BucketedWeights,
+}
 
-class WeightedFiniteUrn(Iterator):
-    def __init__(self, population, weights):
+
+class _UrnMixin:
+    """Copying, saving and stats, for urns which are expensive to build."""
+
+    # The attributes which an urn changes in place, so that copies must not share them
+    _mutable_attributes = ()
+    # The counters of the urn, if enabled. See `sampling.stats`
+    _stats = None
+
+    def enable_stats(self, callback=None):
+        """Count and time the operations on the urn and its weight structure, see `stats`.
+
+        If a callback is given, it is called as callback(operation, elements, seconds)
+        after every operation. Urns without stats enabled pay nothing.
+        """
+        instrumentation.enable(self, callback=callback)
+
+    def disable_stats(self):
+        instrumentation.disable(self)
+
+    def stats(self):
+        """Return the number of calls, elements touched and seconds spent per operation.
+
+        For instance {"urn.draw": {"calls": 2, "elements": 20, "seconds": 0.001}, ...}, or
+        None if stats are not enabled. Copies and saved urns start without stats.
+        """
+        return self._stats.as_dict() if self._stats is not None else None
+
+    def copy(self):
+        """Return an independent urn with the same elements and weights, without rebuilding it.
+
+        The copy draws from the same source of random numbers.
+        """
+        clone = copy.copy(self)
+        for name in self._mutable_attributes:
+            # Attributes which are built lazily, and not built yet, are left to the copy to build
+            if name in self.__dict__:
+                setattr(clone, name, copy.copy(self.__dict__[name]))
+        return clone
+
+    def save(self, path):
+        """Save the urn to a file, which `Urn.load` restores without rebuilding or revalidating it."""
+        snapshot.save(self, path)
+
+
+def _multinomial(weights, size, rng):
+    """The number of times every index is drawn in `size` weighted draws with replacement, as an int64 array.
+
+    The counts are drawn in O(n) time, with one binomial per index of positive weight, whatever
+    the size. Indices of zero weight are left out, so they are never drawn, even by rounding.
+    """
+    weights = np.asarray(weights, dtype=float)
+    counts = np.zeros(len(weights), dtype=np.int64)
+    nonzero = np.flatnonzero(weights)
+    if size == 0:
+        return counts
+    if len(nonzero) == 0:
+        raise ValueError("Cannot draw with replacement when every weight is zero")
+    counts[nonzero] = rng.multinomial(size, weights[nonzero] / weights[nonzero].sum())
+    return counts
+
+
+def _weighted_sample_indices(weights, size, rng=None):
+    """Indices of `size` weighted samples drawn without replacement, in the order they are drawn.
+
+    Every index gets the key E / w, with E exponentially distributed. The index with the
+    smallest key is distributed like a single weighted draw, and the keys of the others
+    are again exponential by memorylessness, so sorting by key gives sequential sampling.
+    Taking the `size` smallest keys costs O(n + size log size).
+    """
+    weights = np.asarray(weights, dtype=float)
+    size = min(size, len(weights))
+    if size == 0:
+        return np.array([], dtype=np.intp)
+
+    with np.errstate(divide="ignore"):
+        keys = make_rng(rng).standard_exponential(len(weights)) / weights
+    if size < len(weights):
+        indices = np.argpartition(keys, size - 1)[:size]
+    else:
+        indices = np.arange(len(weights))
+    return indices[np.argsort(keys[indices], kind="stable")]
+
+
+def _multivariate_hypergeometric(counts, size, rng):
+    """The number of elements of every kind among `size` elements drawn without replacement.
+
+    The kinds are split in halves recursively. Given the number drawn from both halves,
+    the number drawn from the left half is hypergeometric, so every level of the
+    recursion is a single vectorized call, and there are O(log d) levels for d kinds.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    if len(counts) == 0:
+        return counts
+
+    # The sums over the nodes of a complete binary tree, level by level from the leaves
+    num_levels = max(1, (len(counts) - 1).bit_length())
+    sums = [np.zeros(2 ** num_levels, dtype=np.int64)]
+    sums[0][: len(counts)] = counts
+    for _ in range(num_levels):
+        sums.append(sums[-1].reshape(-1, 2).sum(axis=1))
+
+    drawn = np.array([size], dtype=np.int64)
+    for level_sums in reversed(sums[:-1]):
+        left, right = level_sums[0::2], level_sums[1::2]
+        drawn_left = np.zeros_like(drawn)
+        nonzero = drawn > 0
+        drawn_left[nonzero] = rng.hypergeometric(left[nonzero], right[nonzero], drawn[nonzero])
+        drawn = np.stack([drawn_left, drawn - drawn_left], axis=1).ravel()
+    return drawn[: len(counts)]
+
+
+class _WeightedUrn(_UrnMixin, Iterator):
+    """Common functionality of the weighted urns, which are backed by a cumulative sum structure.
+
+    The weight of the element in slot i is _scale * structure[i] + _offset, so that every
+    weight is rescaled or increased in O(1), see `scale_weights` and `boost_weights`.
+    """
+
+    _mutable_attributes = ("_population", "_positions")
+    _scale = 1.0
+    _offset = 0.0
+
+    def __init__(self, population, weights, backend="cumsum", rng=None):
         # TODO: Better error messages
         assert not isinstance(population, set)
         assert not isinstance(weights, set)
+        if backend not in _BACKENDS:
+            raise ValueError(f"'backend' must be one of {sorted(_BACKENDS)}, got {backend!r}")
 
         self._population = list(population)
-        assert all(isinstance(e, Hashable) for e in self._population)
-        assert len(self._population) == len(set(self._population))
+        # Map every (hashable, unique) element to its slot, for O(1) lookups by element
+        self._positions = {element: index for index, element in enumerate(self._population)}
+        assert len(self._positions) == len(self._population)
 
         _weights = list(weights)
         assert all(w >= 0 for w in _weights)
 
-        self._cumulative_sum_object = CumulativeSum(_weights)
+        self._rng = make_rng(rng)
+        self._cumulative_sum_object = self._make_structure(backend, _weights)
+
+    def _make_structure(self, backend, weights):
+        structure = _BACKENDS[backend]
+        if getattr(structure, "randomized", False):
+            return structure(weights, rng=self._rng)
+        return structure(weights)
 
     def __repr__(self):
         return type(self).__name__
@@ -29,35 +180,140 @@ class WeightedFiniteUrn(Iterator):
     def __bool__(self):
         return self.size() > 0
 
+    def __getstate__(self):
+        # The slots of the elements are implied by the population, so they are not saved
+        state = dict(self.__dict__)
+        state.pop("_positions", None)
+        return state
+
+    def __getattr__(self, name):
+        # After a load, the slots of the elements are only rebuilt, in O(n), once an
+        # operation looks up an element. Draws keep the population alone up to date.
+        if name != "_positions" or "_population" not in self.__dict__:
+            raise AttributeError(name)
+        self._positions = {element: index for index, element in enumerate(self._population)}
+        return self._positions
+
     def __contains__(self, value):
-        return value in self._population
+        return value in self._positions
 
-    def __next__(self):
-        if self.size() == 0:
-            raise StopIteration
+    def copy(self):
+        clone = super().copy()
+        # The structure may hold the random source, which is shared rather than copied
+        clone._cumulative_sum_object = copy.deepcopy(self._cumulative_sum_object, {id(self._rng): self._rng})
+        return clone
 
-        pick = random.random() * self._cumulative_sum_object.get_sum()
-        index = self._cumulative_sum_object.query(pick)
-        value = self._population[index]
-        self.remove(value)
-        return value
+    def _weight(self, index):
+        return self._scale * self._cumulative_sum_object[index] + self._offset
 
-    def size(self):
-        return len(self._population)
+    def _stored_weights(self, weights):
+        """The values to store in the structure for the given weights."""
+        weights = list(weights)
+        if self._offset and any(weight < self._offset for weight in weights):
+            # A weight below the offset cannot be stored, so the offset is applied first
+            self._apply_scale()
+        if self._scale == 1 and not self._offset:
+            return weights
+        return [(weight - self._offset) / self._scale for weight in weights]
+
+    def _apply_scale(self):
+        """Write the scale and offset into the weights of the structure, in O(n)."""
+        sum_object = self._cumulative_sum_object
+        if len(sum_object):
+            weights = np.asarray(sum_object.weights, dtype=float) * self._scale + self._offset
+            sum_object.update_weights(np.arange(len(sum_object)), weights)
+        self._scale, self._offset = 1.0, 0.0
+
+    def scale_weights(self, factor):
+        """Multiply every weight by `factor`, such as a decay factor, in O(1).
+
+        The structure is left as it is, and weights given later are divided by the scale
+        before they are stored. Once the scale is extremely small or large, it is written
+        into the structure, in O(n), so that the stored weights keep their precision.
+        """
+        if not factor > 0:
+            raise ValueError(f"'factor' must be positive, got {factor!r}")
+        self._scale *= factor
+        self._offset *= factor
+        if not 2.0 ** -500 < self._scale < 2.0 ** 500:
+            self._apply_scale()
+
+    def boost_weights(self, amount):
+        """Add `amount` to every weight in the urn, in O(1).
+
+        Elements added later get the weight they are given. Draws pick a slot uniformly
+        with probability amount * n / (total weight), and from the structure otherwise.
+        Setting a weight below the accumulated amount applies it to the structure, in O(n).
+        """
+        if not amount >= 0:
+            raise ValueError(f"'amount' must be non-negative, got {amount!r}")
+        self._offset += amount
+
+    def _query(self, uniform):
+        """The slot drawn for a uniform in [0, 1)."""
+        sum_object = self._cumulative_sum_object
+        if not self._offset:
+            return sum_object.query(uniform * sum_object.get_sum())
+
+        total, n = self._scale * sum_object.get_sum(), len(sum_object)
+        pick = uniform * (total + self._offset * n)
+        if pick < total:
+            return sum_object.query(pick / total * sum_object.get_sum())
+        # The offset is the same weight on every slot
+        return min(int((pick - total) / self._offset), n - 1)
+
+    def _query_many(self, uniforms):
+        """The slots drawn for an array of uniforms in [0, 1), as an array."""
+        sum_object = self._cumulative_sum_object
+        if not self._offset:
+            return np.asarray(sum_object.query_many(uniforms * sum_object.get_sum()))
+
+        total, n = self._scale * sum_object.get_sum(), len(sum_object)
+        picks = uniforms * (total + self._offset * n)
+        indices = np.minimum(((picks - total) / self._offset).astype(np.intp), n - 1)
+        from_structure = picks < total
+        if np.any(from_structure):
+            indices[from_structure] = sum_object.query_many(picks[from_structure] / total * sum_object.get_sum())
+        return indices
 
     def update_weight(self, index, value):
         if not isinstance(index, numbers.Integral):
             raise TypeError("'index' must be an integer")
         assert value >= 0  # TODO: Proper type check
-        self._cumulative_sum_object.update_weight(index, value)
+        if value < self._offset:
+            self._apply_scale()
+        self._cumulative_sum_object.update_weight(index, (value - self._offset) / self._scale)
+
+    def update_element_weight(self, element, value):
+        self.update_weight(self._positions[element], value)
+
+    def update_weights(self, indices, values):
+        """Set the weights at many indices at once, which is much faster than one at a time."""
+        indices = np.asarray(indices)
+        values = np.asarray(values, dtype=float)
+        if indices.size and not np.issubdtype(indices.dtype, np.integer):
+            raise TypeError("'indices' must be integers")
+        if not np.all(values >= 0):
+            raise ValueError("'values' must be non-negative")
+        if self._offset and np.any(values < self._offset):
+            self._apply_scale()
+        self._cumulative_sum_object.update_weights(indices.astype(np.intp), (values - self._offset) / self._scale)
+
+    def update_element_weights(self, elements, values):
+        self.update_weights([self._positions[element] for element in elements], values)
 
     def extend(self, elements, weights):
         assert not isinstance(elements, set)
         assert not isinstance(weights, set)
         _elements = list(elements)
+        # Check the whole batch before changing anything, so that a failed extend leaves the urn as it was
+        assert len(set(_elements)) == len(_elements)
+        assert not any(element in self._positions for element in _elements)
+
+        weights = self._stored_weights(weights)
+        for index, element in enumerate(_elements, len(self._population)):
+            self._positions[element] = index
         self._population.extend(_elements)
-        assert all(isinstance(e, Hashable) for e in _elements)
-        assert len(_elements) == len(set(_elements))
 
         self._cumulative_sum_object.extend(weights)
 
@@ -65,25 +321,269 @@ class WeightedFiniteUrn(Iterator):
         self.extend([element], [weight])
 
     def remove(self, element):
-        index = self._population.index(element)
-        self._population.pop(index)
+        self._remove_index(self._positions[element])
+
+    def _pop_slot(self, index):
+        # Move the last element into the slot, mirroring the cumulative sum structure
+        positions = self.__dict__.get("_positions")
+        if positions is not None:
+            del positions[self._population[index]]
+        last = self._population.pop()
+        if index < len(self._population):
+            self._population[index] = last
+            if positions is not None:
+                positions[last] = index
+
+    def _remove_index(self, index):
+        self._pop_slot(index)
         self._cumulative_sum_object.remove(index)
 
+    def _remove_indices(self, indices):
+        # Removing in decreasing order never moves an element which is yet to be removed
+        indices = sorted(indices, reverse=True)
+        for index in indices:
+            self._pop_slot(index)
+        self._cumulative_sum_object.remove_many(indices)
 
-class WeightedInfiniteUrn(Iterator):
-    def __init__(self, population, weights):
-        # TODO: Better error messages
-        assert not isinstance(population, set)
-        assert not isinstance(weights, set)
 
-        self._population = list(population)
-        assert all(isinstance(e, Hashable) for e in self._population)
-        assert len(self._population) == len(set(self._population))
+class WeightedFiniteUrn(_WeightedUrn):
+    _mutable_attributes = ("_population", "_positions", "_removed")
 
-        _weights = list(weights)
-        assert all(w >= 0 for w in _weights)
+    def __init__(self, population, weights, backend="cumsum", rng=None):
+        super().__init__(population, weights, backend=backend, rng=rng)
+        self._removed = []  # The elements drawn or removed, with their weights
+
+    def __next__(self):
+        if self.size() == 0:
+            raise StopIteration
+
+        index = self._query(self._rng.random())
+        value = self._population[index]
+        self._remove_index(index)
+        return value
+
+    def draw(self, size):
+        """Draw `size` elements at once, or all remaining elements if fewer are left."""
+        size = min(size, self.size())
+        sum_object = self._cumulative_sum_object
+
+        # A few draws from a dynamic structure are cheaper than assigning keys to every element,
+        # and structures in plain Python are always drawn from one element at a time
+        vectorized = getattr(sum_object, "vectorized", True)
+        if not vectorized or sum_object.dynamic and size * math.log2(len(sum_object) + 1) < len(sum_object):
+            values = []
+            for uniform in self._rng.random_list(size):
+                index = self._query(uniform)
+                values.append(self._population[index])
+                self._remove_index(index)
+            return values
+
+        weights = sum_object.weights
+        if self._offset:
+            # Keys only depend on the weights up to a factor, which is the scale
+            weights = np.asarray(weights, dtype=float) + self._offset / self._scale
+        indices = _weighted_sample_indices(weights, size, self._rng).tolist()
+        values = [self._population[index] for index in indices]
+        self._remove_indices(indices)
+        return values
+
+    def size(self):
+        return len(self._population)
+
+    def _remove_index(self, index):
+        self._removed.append((self._population[index], self._weight(index)))
+        super()._remove_index(index)
+
+    def _remove_indices(self, indices):
+        self._removed.extend((self._population[index], self._weight(index)) for index in indices)
+        super()._remove_indices(indices)
+
+    def reset(self):
+        """Put back every element drawn or removed, with the weight it had when it was taken out.
+
+        The elements are appended to the weight structure, so a reset costs O(k log n) for
+        k elements with the tree, O(k) with buckets, and O(n) with the structures which are
+        rebuilt on any change. Weights updated since are left as they are, and so are
+        elements which were added back since. An element taken out more than once gets
+        the weight it had when it was last taken out.
+        """
+        restored = dict()
+        for element, weight in reversed(self._removed):
+            if element not in restored and element not in self:
+                restored[element] = weight
+        if restored:
+            self.extend(list(restored), list(restored.values()))
+        self._removed = []
+
+
+class WeightedInfiniteUrn(_WeightedUrn):
+    def __next__(self):
+        if self.size() == 0:
+            raise StopIteration
+
+        return self._population[self._query(self._rng.random())]
+
+    def draw(self, size):
+        """Draw `size` elements at once."""
+        if len(self._population) == 0:
+            return []
+
+        if not getattr(self._cumulative_sum_object, "vectorized", True):
+            return [self._population[self._query(uniform)] for uniform in self._rng.random_list(size)]
+
+        indices = self._query_many(self._rng.random_array(size))
+        return [self._population[index] for index in indices.tolist()]
+
+    def _slot_counts(self, size):
+        weights = self._cumulative_sum_object.weights
+        if self._offset:
+            weights = np.asarray(weights, dtype=float) + self._offset / self._scale
+        return _multinomial(weights, size, self._rng)
+
+    def draw_counts(self, size):
+        """Draw `size` elements at once, returning the number of times every element was drawn.
+
+        The result is a collections.Counter of the elements drawn at least once. The counts follow
+        a multinomial distribution, drawn in O(n) time whatever the size, instead of drawing and
+        counting `size` elements.
+        """
+        if len(self._population) == 0:
+            return collections.Counter()
+        counts = self._slot_counts(size)
+        indices = np.flatnonzero(counts)
+        elements = [self._population[index] for index in indices.tolist()]
+        return collections.Counter(dict(zip(elements, counts[indices].tolist())))
+
+    def size(self):
+        # TODO: Think about what size of an infinite urn should mean
+        return float("inf")
+
+
+class CountsUrn(_WeightedUrn):
+    """An urn of distinct elements with multiplicities, sampled without replacement.
+
+    Every distinct element takes one slot, whose weight in the structure is its count,
+    so an element with a count of 10**6 costs no more than one with a count of 1. With
+    the default tree, a single draw costs O(log d) for d distinct elements.
+
+    Elements whose count drops to zero are removed. Updating the weight of a slot sets
+    the count of its element.
+    """
+
+    def __init__(self, counts, backend="tree", rng=None):
+        counts = dict(counts)
+        assert all(isinstance(count, numbers.Integral) and count >= 0 for count in counts.values())
+        counts = {element: count for element, count in counts.items() if count > 0}
+        super().__init__(counts.keys(), counts.values(), backend=backend, rng=rng)
+
+    def __contains__(self, value):
+        return value in self._positions and self._cumulative_sum_object[self._positions[value]] > 0
 
-        self._cumulative_sum_object = CumulativeSum(_weights)
+    def scale_weights(self, factor):
+        raise TypeError("The weights of a counts urn are the counts of its elements, which cannot be scaled")
+
+    def boost_weights(self, amount):
+        raise TypeError("The weights of a counts urn are the counts of its elements, which cannot be boosted")
+
+    def __next__(self):
+        if self.size() == 0:
+            raise StopIteration
+
+        pick = self._rng.random() * self._cumulative_sum_object.get_sum()
+        index = self._cumulative_sum_object.query(pick)
+        value = self._population[index]
+        self._decrement(index, 1)
+        return value
+
+    def _decrement(self, index, count):
+        remaining = int(self._cumulative_sum_object[index]) - count
+        if remaining > 0:
+            self._cumulative_sum_object.update_weight(index, remaining)
+        else:
+            self._remove_index(index)
+
+    def count(self, element):
+        """The number of copies of `element` in the urn."""
+        return int(self._cumulative_sum_object[self._positions[element]]) if element in self._positions else 0
+
+    def counts(self):
+        """The counts of the elements in the urn, as a dict."""
+        weights = np.asarray(self._cumulative_sum_object.weights, dtype=np.int64).tolist()
+        return {element: count for element, count in zip(self._population, weights) if count > 0}
+
+    def draw_counts(self, size):
+        """Draw `size` elements at once, returning the number of copies drawn of every element.
+
+        All remaining elements are drawn if fewer are left. The result is a collections.Counter,
+        and the counts follow a multivariate hypergeometric distribution, drawn in O(d) time with
+        O(log d) vectorized calls, without expanding the elements into copies.
+        """
+        size = min(size, self.size())
+        weights = np.asarray(self._cumulative_sum_object.weights, dtype=np.int64)
+        drawn = _multivariate_hypergeometric(weights, size, self._rng)
+
+        indices = np.flatnonzero(drawn)
+        elements = [self._population[index] for index in indices.tolist()]
+        result = collections.Counter(dict(zip(elements, drawn[indices].tolist())))
+        remaining = weights[indices] - drawn[indices]
+        kept = remaining > 0
+        if np.any(kept):
+            self._cumulative_sum_object.update_weights(indices[kept], remaining[kept])
+        if not np.all(kept):
+            self._remove_indices(indices[~kept].tolist())
+        return result
+
+    def draw(self, size):
+        """Draw `size` elements at once, or all remaining elements if fewer are left."""
+        size = min(size, self.size())
+        if size * math.log2(len(self._population) + 1) < len(self._population):
+            return [next(self) for _ in range(size)]
+
+        # Drawn counts in a random order are distributed as sequential draws
+        values = list(self.draw_counts(size).elements())
+        self._rng.shuffle(values)
+        return values
+
+    def size(self):
+        return int(self._cumulative_sum_object.get_sum()) if self._population else 0
+
+    def add(self, element, count=1):
+        """Add `count` copies of `element`."""
+        if element in self._positions:
+            index = self._positions[element]
+            self._cumulative_sum_object.update_weight(index, int(self._cumulative_sum_object[index]) + count)
+        else:
+            self.extend([element], [count])
+
+    def remove(self, element, count=1):
+        """Remove `count` copies of `element`, or all of them if there are fewer."""
+        if element not in self:
+            raise ValueError(f"{element!r} is not in the urn")
+        self._decrement(self._positions[element], count)
+
+
+def _load_array(array):
+    """Memory-map a .npy file given by its path, and pass anything else through uncopied."""
+    if isinstance(array, (str, os.PathLike)):
+        return np.load(array, mmap_mode="r")
+    return array
+
+
+class _MemmapWeightedUrn(_UrnMixin, Iterator):
+    """Common functionality of the weighted urns over arrays which need not fit in memory.
+
+    The population and the weights are arrays, typically memory maps, or paths to .npy
+    files which are memory-mapped. Neither is copied or modified. Only the sums of blocks
+    of weights are kept in memory, see `BlockedCumulativeSum`.
+    """
+
+    def __init__(self, population, weights, block_size=2 ** 16, rng=None):
+        self._population = _load_array(population)
+        weights = _load_array(weights)
+        assert len(self._population) == len(weights)
+
+        self._cumulative_sum_object = BlockedCumulativeSum(weights, block_size=block_size)
+        self._rng = make_rng(rng)
 
     def __repr__(self):
         return type(self).__name__
@@ -94,50 +594,145 @@ class WeightedInfiniteUrn(Iterator):
     def __bool__(self):
         return self.size() > 0
 
+    def __getstate__(self):
+        return {**self.__dict__, "_population": _dump_array(self._population)}
+
+    def copy(self):
+        clone = super().copy()
+        # The arrays are never written to, so they are shared rather than copied
+        weights = self._cumulative_sum_object.weights
+        shared = {id(self._rng): self._rng, id(weights): weights}
+        clone._cumulative_sum_object = copy.deepcopy(self._cumulative_sum_object, shared)
+        return clone
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _population=_load_dumped_array(state["_population"]))
+
+    def _find(self, value):
+        """Yield the indices of elements equal to `value`, comparing one block at a time."""
+        block_size = self._cumulative_sum_object.block_size
+        for start in range(0, len(self._population), block_size):
+            for i in np.flatnonzero(self._population[start : start + block_size] == value).tolist():
+                yield start + i
+
+    def update_weight(self, index, value):
+        if not isinstance(index, numbers.Integral):
+            raise TypeError("'index' must be an integer")
+        if not value >= 0:
+            raise ValueError(f"'value' must be non-negative, got {value!r}")
+        self._cumulative_sum_object.update_weight(index, value)
+
+    def update_weights(self, indices, values):
+        for index, value in zip(indices, values):
+            if not isinstance(index, numbers.Integral):
+                raise TypeError("'index' must be an integer")
+            if not value >= 0:
+                raise ValueError(f"'values' must be non-negative, got {value!r}")
+        self._cumulative_sum_object.update_weights(indices, values)
+
+
+class MemmapWeightedFiniteUrn(_MemmapWeightedUrn):
+    """Weighted sampling without replacement from arrays which need not fit in memory.
+
+    Elements are removed by setting their weight to zero, so the indices of elements
+    never change, and memory grows by O(1) per removed element.
+    """
+
+    _mutable_attributes = ("_removed",)
+
+    def __init__(self, population, weights, block_size=2 ** 16, rng=None):
+        super().__init__(population, weights, block_size=block_size, rng=rng)
+        self._removed = dict()  # Maps the index of a removed element to its weight
+
     def __contains__(self, value):
-        return value in self._population
+        return any(index not in self._removed for index in self._find(value))
+
+    def _pick(self, uniform):
+        total = self._cumulative_sum_object.get_sum()
+        if total == 0:
+            # Only elements with zero weight remain
+            return next(i for i in range(len(self._population)) if i not in self._removed)
+        return self._cumulative_sum_object.query(uniform * total)
 
     def __next__(self):
         if self.size() == 0:
             raise StopIteration
 
-        pick = random.random() * self._cumulative_sum_object.get_sum()
-        index = self._cumulative_sum_object.query(pick)
+        index = self._pick(self._rng.random())
+        self._remove_index(index)
         return self._population[index]
 
+    def draw(self, size):
+        """Draw `size` elements at once, or all remaining elements if fewer are left."""
+        values = []
+        for uniform in self._rng.random_list(min(size, self.size())):
+            index = self._pick(uniform)
+            self._remove_index(index)
+            values.append(self._population[index])
+        return values
+
     def size(self):
-        # TODO: Think about what size of an infinite urn should mean
-        return float("inf")
+        return len(self._population) - len(self._removed)
 
     def update_weight(self, index, value):
-        if not isinstance(index, numbers.Integral):
-            raise TypeError("'index' must be an integer")
-        assert value >= 0  # TODO: Proper type check
-        self._cumulative_sum_object.update_weight(index, value)
+        if index in self._removed:
+            raise ValueError(f"The element at index {index} has been removed")
+        super().update_weight(index, value)
 
-    def extend(self, elements, weights):
-        assert not isinstance(elements, set)
-        assert not isinstance(weights, set)
-        _elements = list(elements)
-        self._population.extend(_elements)
-        assert all(isinstance(e, Hashable) for e in _elements)
-        assert len(_elements) == len(set(_elements))
+    def update_weights(self, indices, values):
+        if any(index in self._removed for index in indices):
+            raise ValueError("Some of the indices belong to removed elements")
+        super().update_weights(indices, values)
 
-        self._cumulative_sum_object.extend(weights)
+    def remove(self, element):
+        index = next((index for index in self._find(element) if index not in self._removed), None)
+        if index is None:
+            raise ValueError(f"{element!r} is not in the urn")
+        self._remove_index(index)
 
-    def add(self, element, weight):
-        self.extend([element], [weight])
+    def _remove_index(self, index):
+        self._removed[index] = self._cumulative_sum_object[index]
+        self._cumulative_sum_object.update_weight(index, 0)
+
+    def reset(self):
+        """Put back every element drawn or removed, rereading every affected block of weights once."""
+        if self._removed:
+            self._cumulative_sum_object.update_weights(list(self._removed), list(self._removed.values()))
+            self._removed = dict()
 
-    def remove(self, element):
-        index = self._population.index(element)
-        self._population.pop(index)
-        self._cumulative_sum_object.remove(index)
 
+class MemmapWeightedInfiniteUrn(_MemmapWeightedUrn):
+    """Weighted sampling with replacement from arrays which need not fit in memory."""
 
-class UnweightedFiniteUrn(Iterator):
-    def __init__(self, population):
+    def __contains__(self, value):
+        return next(self._find(value), None) is not None
+
+    def __next__(self):
+        if self._cumulative_sum_object.get_sum() == 0:
+            raise StopIteration
+
+        pick = self._rng.random() * self._cumulative_sum_object.get_sum()
+        return self._population[self._cumulative_sum_object.query(pick)]
+
+    def draw(self, size):
+        """Draw `size` elements at once, reading every block of weights at most once."""
+        if self._cumulative_sum_object.get_sum() == 0:
+            return []
+
+        picks = self._rng.random_array(size) * self._cumulative_sum_object.get_sum()
+        return list(self._population[self._cumulative_sum_object.query_many(picks)])
+
+    def size(self):
+        return float("inf")
+
+
+class UnweightedFiniteUrn(_UrnMixin, Iterator):
+    _mutable_attributes = ("_population",)
+
+    def __init__(self, population, rng=None):
         self._population = list(population)
         self._num_remaining = len(self._population)
+        self._rng = make_rng(rng)
 
     def __repr__(self):
         return type(self).__name__
@@ -149,7 +744,11 @@ class UnweightedFiniteUrn(Iterator):
         return self.size() > 0
 
     def __contains__(self, value):
-        return value in self._population[: self._num_remaining]
+        try:
+            self._population.index(value, 0, self._num_remaining)
+        except ValueError:
+            return False
+        return True
 
     def __next__(self):
         if self._num_remaining == 0:
@@ -157,7 +756,7 @@ class UnweightedFiniteUrn(Iterator):
         self._num_remaining -= 1
 
         # generate a random number in [0, num_remaining]
-        pick = math.floor(random.random() * (self._num_remaining + 1))
+        pick = math.floor(self._rng.random() * (self._num_remaining + 1))
 
         # Move our pick to the last index within current range, return it
         self._population[self._num_remaining], self._population[pick] = (
@@ -166,6 +765,19 @@ class UnweightedFiniteUrn(Iterator):
         )
         return self._population[self._num_remaining]
 
+    def draw(self, size):
+        """Draw `size` elements at once, or all remaining elements if fewer are left."""
+        size = min(size, self._num_remaining)
+        population = self._population
+
+        # A partial Fisher-Yates shuffle, moving the picks to the end of the remaining range
+        for uniform in self._rng.random_list(size):
+            self._num_remaining -= 1
+            pick = math.floor(uniform * (self._num_remaining + 1))
+            population[self._num_remaining], population[pick] = population[pick], population[self._num_remaining]
+
+        return population[self._num_remaining : self._num_remaining + size][::-1]
+
     def size(self):
         return self._num_remaining
 
@@ -181,15 +793,151 @@ class UnweightedFiniteUrn(Iterator):
         self.extend([element])
 
     def remove(self, element):
-        i = self._population[: self._num_remaining].index(element)
-        self._population.pop(i)
+        i = self._population.index(element, 0, self._num_remaining)
+
+        # Move the element past the remaining range, as if it were drawn
+        population = self._population
         self._num_remaining -= 1
+        population[i], population[self._num_remaining] = population[self._num_remaining], population[i]
 
+    def reset(self):
+        """Put back every element drawn or removed, in O(1), as they are kept past the remaining range."""
+        self._num_remaining = len(self._population)
 
-class UnweightedInfiniteUrn(Iterator):
-    def __init__(self, population):
-        self._population = list(population)
+
+class SparseUnweightedFiniteUrn(_UrnMixin, Iterator):
+    """An unweighted finite urn over a sequence, which is never copied or modified.
+
+    Draws perform a virtual Fisher-Yates shuffle. Only the positions displaced by the
+    shuffle are recorded, in a pair of dicts, so memory is O(k) after k draws and O(1)
+    on creation, even for a population such as range(10**12) or a memory-mapped array.
+    """
+
+    # Elements of NumPy arrays are compared in blocks, bounding the memory of lookups
+    _block_size = 2 ** 20
+
+    _mutable_attributes = ("_extra", "_sources", "_positions")
+
+    def __init__(self, population, rng=None):
+        self._rng = make_rng(rng)
+        self._population = population
+        self._extra = []  # Elements added with extend(), with sources after the population
+        self._num_remaining = len(population)
+        self._num_total = len(population)
+
+        # The shuffle is a permutation of sources (indices into the population) over
+        # positions, where positions below `_num_remaining` have not been drawn yet.
+        # Both maps only hold entries which differ from the identity.
+        self._sources = dict()
+        self._positions = dict()
+
+    def __repr__(self):
+        return type(self).__name__
+
+    def __getstate__(self):
+        # A memory-mapped population is saved as a reference to its file, not as a copy
+        return {**self.__dict__, "_population": _dump_array(self._population)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state, _population=_load_dumped_array(state["_population"]))
+
+    def __iter__(self):
+        return self
+
+    def __bool__(self):
+        return self.size() > 0
+
+    def _element(self, source):
+        if source < len(self._population):
+            return self._population[source]
+        return self._extra[source - len(self._population)]
+
+    def _swap(self, position, other_position):
+        source = self._sources.get(position, position)
+        other_source = self._sources.get(other_position, other_position)
+        self._sources[position], self._positions[other_source] = other_source, position
+        self._sources[other_position], self._positions[source] = source, other_position
+
+    def _find(self, value):
+        """Return the position of a remaining element equal to `value`, or None."""
+        if isinstance(self._population, range):
+            sources = [self._population.index(value)] if value in self._population else []
+        elif is_numpy_instance(self._population, "ndarray"):
+            sources = (
+                start + i
+                for start in range(0, len(self._population), self._block_size)
+                for i in np.flatnonzero(self._population[start : start + self._block_size] == value).tolist()
+            )
+        else:
+            sources = (i for (i, element) in enumerate(self._population) if element == value)
+        extra_sources = (len(self._population) + i for (i, element) in enumerate(self._extra) if element == value)
+
+        for source in itertools.chain(sources, extra_sources):
+            position = self._positions.get(source, source)
+            if position < self._num_remaining:
+                return position
+        return None
+
+    def __contains__(self, value):
+        return self._find(value) is not None
+
+    def __next__(self):
+        if self._num_remaining == 0:
+            raise StopIteration
+        self._num_remaining -= 1
+
+        # Move a random pick to the last position within current range, return it
+        pick = math.floor(self._rng.random() * (self._num_remaining + 1))
+        self._swap(pick, self._num_remaining)
+        return self._element(self._sources[self._num_remaining])
+
+    def draw(self, size):
+        """Draw `size` elements at once, or all remaining elements if fewer are left."""
+        size = min(size, self._num_remaining)
+
+        values = []
+        for uniform in self._rng.random_list(size):
+            self._num_remaining -= 1
+            pick = math.floor(uniform * (self._num_remaining + 1))
+            self._swap(pick, self._num_remaining)
+            values.append(self._element(self._sources[self._num_remaining]))
+        return values
+
+    def size(self):
+        return self._num_remaining
+
+    def extend(self, population):
+        # Every new element is appended after the last position, and swapped to the remaining range
+        for element in population:
+            self._extra.append(element)
+            self._swap(self._num_remaining, self._num_total)
+            self._num_remaining += 1
+            self._num_total += 1
+
+    def add(self, element):
+        self.extend([element])
+
+    def remove(self, element):
+        position = self._find(element)
+        if position is None:
+            raise ValueError(f"{element!r} is not in the urn")
+        self._num_remaining -= 1
+        self._swap(position, self._num_remaining)
+
+    def reset(self):
+        """Put back every element drawn or removed, in O(1), by forgetting the shuffle."""
+        self._sources, self._positions = dict(), dict()
+        self._num_remaining = self._num_total
+
+
+class UnweightedInfiniteUrn(_UrnMixin, Iterator):
+    _mutable_attributes = ("_population",)
+
+    def __init__(self, population, rng=None):
+        # A range is never materialized, unless elements are added or removed
+        self._population = population if isinstance(population, range) else list(population)
         self._num_remaining = float("inf")
+        self._rng = make_rng(rng)
 
     def __repr__(self):
         return type(self).__name__
@@ -205,14 +953,24 @@ class UnweightedInfiniteUrn(Iterator):
 
     def __next__(self):
         # Get a random index within the boundaries of our collection
-        index_choice = math.floor(random.random() * len(self._population))
+        index_choice = math.floor(self._rng.random() * len(self._population))
         return self._population[index_choice]
 
+    def draw(self, size):
+        """Draw `size` elements at once."""
+        population, n = self._population, len(self._population)
+        return [population[int(uniform * n)] for uniform in self._rng.random_list(size)]
+
     def size(self):
         # TODO: Think about what size of an infinite urn should mean
         return float("inf")
 
+    def _materialize(self):
+        if isinstance(self._population, range):
+            self._population = list(self._population)
+
     def extend(self, population):
+        self._materialize()
         self._population.extend(list(population))
 
     def add(self, element):
@@ -220,11 +978,134 @@ class UnweightedInfiniteUrn(Iterator):
         self.extend([element])
 
     def remove(self, element):
+        self._materialize()
+
+        # Move the last element into the slot
         i = self._population.index(element)
-        self._population.pop(i)
+        last = self._population.pop()
+        if i < len(self._population):
+            self._population[i] = last
+
+
+class _WeightedIndexUrn:
+    """Mixin for weighted urns over the positions 0, ..., n - 1 of a population, which is not kept.
+
+    The slots of the urn hold positions in an int64 array, and the slot of every position
+    is kept in another array, -1 if the position has been removed. Neither boxes an
+    element, and draws return int64 arrays of positions.
+    """
+
+    def _init_positions(self, num_positions, weights, backend, rng):
+        if backend not in _BACKENDS:
+            raise ValueError(f"'backend' must be one of {sorted(_BACKENDS)}, got {backend!r}")
+        weights = np.asarray(weights, dtype=float)
+        assert weights.shape == (num_positions,)
+        assert np.all(weights >= 0)
 
+        self._population = np.arange(num_positions, dtype=np.int64)
+        self._positions = np.arange(num_positions, dtype=np.int64)
+        self._rng = make_rng(rng)
+        self._cumulative_sum_object = self._make_structure(backend, weights)
 
-def Urn(population, replace=False, weights=None):
+    def __getstate__(self):
+        # The slots of the positions are an array, which is saved as it is
+        return dict(self.__dict__)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __contains__(self, value):
+        return 0 <= value < len(self._positions) and self._positions[value] >= 0
+
+    def _pop_slot(self, index):
+        # Move the last position into the slot, and shrink the view of the slots by one
+        last = len(self._population) - 1
+        position, moved = self._population[index], self._population[last]
+        self._population[index] = moved
+        self._positions[moved] = index
+        self._positions[position] = -1
+        self._population = self._population[:last]
+
+    def extend(self, positions, weights):
+        """Put back removed positions, with the given weights."""
+        positions = np.asarray(positions, dtype=np.int64)
+        assert np.all(self._positions[positions] < 0)
+        self._positions[positions] = np.arange(len(self._population), len(self._population) + len(positions))
+        self._population = np.concatenate([self._population, positions])
+        self._cumulative_sum_object.extend(self._stored_weights(weights))
+
+    def __next__(self):
+        return int(super().__next__())
+
+
+class IndexWeightedFiniteUrn(_WeightedIndexUrn, WeightedFiniteUrn):
+    """Weighted sampling of positions without replacement, see `Urn(..., return_indices=True)`."""
+
+    def __init__(self, num_positions, weights, backend="cumsum", rng=None):
+        self._init_positions(num_positions, weights, backend, rng)
+        self._removed = []
+
+    def draw(self, size):
+        return np.array(super().draw(size), dtype=np.int64)
+
+
+class IndexWeightedInfiniteUrn(_WeightedIndexUrn, WeightedInfiniteUrn):
+    """Weighted sampling of positions with replacement, see `Urn(..., return_indices=True)`."""
+
+    def __init__(self, num_positions, weights, backend="cumsum", rng=None):
+        self._init_positions(num_positions, weights, backend, rng)
+
+    def draw(self, size):
+        if len(self._population) == 0:
+            return np.array([], dtype=np.int64)
+        return self._population[self._query_many(self._rng.random_array(size))]
+
+    def draw_counts(self, size):
+        """Draw `size` positions at once, returning an int64 array of how many times every position was drawn.
+
+        The array has one entry per position of the population, including removed ones.
+        """
+        counts = np.zeros(len(self._positions), dtype=np.int64)
+        if len(self._population):
+            counts[self._population] = self._slot_counts(size)
+        return counts
+
+
+class IndexUnweightedFiniteUrn(SparseUnweightedFiniteUrn):
+    """Sampling of positions without replacement, see `Urn(..., return_indices=True)`."""
+
+    def __init__(self, num_positions, rng=None):
+        super().__init__(range(num_positions), rng=rng)
+
+    def draw(self, size):
+        return np.array(super().draw(size), dtype=np.int64)
+
+
+class IndexUnweightedInfiniteUrn(UnweightedInfiniteUrn):
+    """Sampling of positions with replacement, see `Urn(..., return_indices=True)`."""
+
+    def __init__(self, num_positions, rng=None):
+        super().__init__(range(num_positions), rng=rng)
+
+    def draw(self, size):
+        num_positions = len(self._population)
+        if isinstance(self._population, range):
+            positions = (self._rng.random_array(size) * num_positions).astype(np.int64)
+            return np.minimum(positions, num_positions - 1)
+        return np.array(super().draw(size), dtype=np.int64)
+
+
+def Urn(
+    population,
+    replace=False,
+    weights=None,
+    backend="cumsum",
+    copy=True,
+    rng=None,
+    buffer_size=1024,
+    stats=False,
+    return_indices=False,
+):
     """Initialize Urn.
 
         Parameters
@@ -235,17 +1116,93 @@ def Urn(population, replace=False, weights=None):
         replace : bool
             Whether or not the population is replaced (default False)
         weights : Sequence
-            An indexable, iterable (mutable) sequence of weights corresponding to population (default None)
+            An indexable, iterable (mutable) sequence of weights corresponding to population (default None).
+            If the weights are a memory map (np.memmap), or the path to a .npy file which is then
+            memory-mapped, the weights are never read into memory all at once. The population must
+            then be an array (or the path to a .npy file), which is never copied.
+        backend : str
+            The structure used for weighted sampling (default "cumsum"). Either "cumsum", which
+            recomputes a NumPy cumulative sum in O(n) on every change, or "tree", a binary tree
+            of partial sums with O(log n) queries, updates, removals and appends, or "fenwick",
+            the same operations on a Fenwick tree in plain Python lists, which never imports NumPy
+            and is the fastest choice for small urns drawn one element at a time, or "alias",
+            an alias table with O(1) queries which is rebuilt in O(n) after any change. The
+            alias table is the fastest choice for static distributions sampled with replacement.
+            Finally "buckets" groups weights by their power of two and samples by rejection,
+            with expected O(1) queries, updates, removals and appends, which suits workloads
+            mixing changes and draws. Ignored if no weights are given.
+        copy : bool
+            Whether an unweighted urn without replacement copies the population into a list
+            (default True). If False, the population is left untouched and only the positions
+            displaced by draws are recorded, which takes O(k) memory for k draws. This suits
+            large sequences such as NumPy arrays or memory maps. Ranges are never copied,
+            which suits drawing a few elements from a large range, but drawing all of them
+            takes longer and more memory than from a copy: use `list(range(n))` for that.
+        rng : None, int, numpy.random.Generator
+            The source of random numbers (default None). If None, the global state of the
+            `random` and `numpy.random` modules is used. If a seed or a generator is given,
+            the urn draws from its own reproducible stream.
+        buffer_size : int
+            The number of uniforms a seeded generator produces at a time, for single draws
+            with next() (default 1024). This bounds the overhead of the generator, but single
+            draws from a seeded urn remain somewhat slower than with the global `random` module.
+        stats : bool or callable
+            Whether to count and time the operations on the urn, including building it, see
+            `urn.stats()` (default False). A callable is called as callback(operation,
+            elements, seconds) after every operation.
+        return_indices : bool
+            Whether the urn holds the positions 0, ..., n - 1 of the population instead of its
+            elements (default False). The population is then only used for its length, and is
+            never copied, so it may be a NumPy array or a DataFrame. Draws return int64 arrays of
+            positions, with which to index the population. Not supported for memory-mapped weights.
     """
+    make = _make_index_urn if return_indices else _make_urn
+    if not stats:
+        return make(population, replace, weights, backend, copy, make_rng(rng, buffer_size=buffer_size))
 
-    if replace and weights:
-        return WeightedInfiniteUrn(population, weights)
-    elif not replace and weights:
-        return WeightedFiniteUrn(population, weights)
+    start = time.perf_counter()
+    urn = make(population, replace, weights, backend, copy, make_rng(rng, buffer_size=buffer_size))
+    seconds = time.perf_counter() - start
+    urn.enable_stats(callback=stats if callable(stats) else None)
+    # The population may be a path, or an iterable which the urn has consumed
+    urn._stats.record("urn.build", len(urn._population), seconds)
+    return urn
+
+
+def _make_urn(population, replace, weights, backend, copy, rng):
+    # Weights which need not fit in memory, as a memory map or a path to a .npy file
+    if isinstance(weights, (str, os.PathLike)) or is_numpy_instance(weights, "memmap"):
+        if replace:
+            return MemmapWeightedInfiniteUrn(population, weights, rng=rng)
+        return MemmapWeightedFiniteUrn(population, weights, rng=rng)
+
+    if replace and weights is not None:
+        return WeightedInfiniteUrn(population, weights, backend=backend, rng=rng)
+    elif not replace and weights is not None:
+        return WeightedFiniteUrn(population, weights, backend=backend, rng=rng)
     elif replace and weights is None:
-        return UnweightedInfiniteUrn(population)
+        return UnweightedInfiniteUrn(population, rng=rng)
+    elif not replace and weights is None and (not copy or isinstance(population, range)):
+        return SparseUnweightedFiniteUrn(population, rng=rng)
     elif not replace and weights is None:
-        return UnweightedFiniteUrn(population)
+        return UnweightedFiniteUrn(population, rng=rng)
     else:
         # TODO: Raise proper exception
         raise Exception
+
+
+def _make_index_urn(population, replace, weights, backend, copy, rng):
+    if isinstance(weights, (str, os.PathLike)) or is_numpy_instance(weights, "memmap"):
+        raise ValueError("'return_indices' is not supported with memory-mapped weights")
+
+    if weights is not None:
+        if replace:
+            return IndexWeightedInfiniteUrn(len(population), weights, backend=backend, rng=rng)
+        return IndexWeightedFiniteUrn(len(population), weights, backend=backend, rng=rng)
+    if replace:
+        return IndexUnweightedInfiniteUrn(len(population), rng=rng)
+    return IndexUnweightedFiniteUrn(len(population), rng=rng)
+
+
+Urn.load = snapshot.load
+Urn.from_counts = CountsUrn
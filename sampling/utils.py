@@ -1,22 +1,46 @@
-from sampling.urns import Urn
+from sampling.urns import Urn, _multinomial, _weighted_sample_indices
+from sampling.reservoir import reservoir_sample
+from sampling.rng import make_rng
 import itertools
+from sampling.lazy import np
+from collections.abc import Iterator, Sequence
 
 
-def sample(population, size=1, replace=False, weights=None):
+def sample(population, size=1, replace=False, weights=None, rng=None, return_indices=False, return_counts=False):
     """
     Draw samples from a collection.
     
     Parameters
     ----------
     population: list
-        The data points. 
+        The data points. Sequences such as range() are indexed directly,
+        without being copied. If an iterator (such as a generator) is passed, it is
+        consumed once, and samples without replacement are drawn with a reservoir
+        of O(size) memory.
     
     replace: bool
         Sample with or without replacement.
         
-    weights: list
-        One weight per data point. If None is
+    weights: list or callable
+        One weight per data point. If a callable is passed, it is
+        applied to every data point to compute its weight. If None is
         passed, uniform weights are used.
+
+    rng: None, int or numpy.random.Generator
+        The source of random numbers. If None, the global state of the
+        `random` and `numpy.random` modules is used. Passing a seed makes
+        the result reproducible.
+
+    return_indices: bool
+        Return the positions of the samples in the population, as an int64 NumPy
+        array, instead of the samples. The population is only used for its length
+        (and for its elements if the weights are a callable), and is never copied.
+
+    return_counts: bool
+        Return the number of times every position of the population is drawn, as an
+        int64 NumPy array of the length of the population, instead of the samples. With
+        replacement, the counts follow a multinomial distribution, drawn in O(n) time
+        whatever the size.
         
     Returns
     -------
@@ -33,12 +57,109 @@ def sample(population, size=1, replace=False, weights=None):
     >>> sample(data, replace=False, weights=None)
     
     """
-    # TODO: Special case when built-in-range is passed
-    # TODO: Special case when datastream is passed
-    urn = Urn(population=population, replace=replace, weights=weights)
+    rng = make_rng(rng)
+    if return_indices and return_counts:
+        raise ValueError("'return_indices' and 'return_counts' cannot both be set")
+    if return_indices or return_counts:
+        if isinstance(population, Iterator):
+            raise TypeError("Positions require a population with a length, not an iterator")
+        if callable(weights):
+            weights = np.fromiter(map(weights, population), dtype=float, count=len(population))
+        if return_counts:
+            return _sample_counts(len(population), size, replace, weights, rng)
+        return _sample_indices(len(population), size, replace, weights, rng)
+
+    if isinstance(population, Iterator):
+        if not replace:
+            return reservoir_sample(population, size=size, weights=weights, rng=rng)
+        population = list(population)
+
+    if callable(weights):
+        weights = [weights(element) for element in population]
+
+    if weights is not None and not replace:
+        # The urn is discarded afterwards, so draw all samples at once in O(n + size log size)
+        population = population if isinstance(population, Sequence) else list(population)
+        weights = list(weights)
+        assert len(population) == len(weights)
+        assert all(w >= 0 for w in weights)
+        return [population[index] for index in _weighted_sample_indices(weights, size, rng).tolist()]
+
+    if weights is None and isinstance(population, Sequence):
+        # Index directly into sequences such as range(10**12), in O(size) time and memory
+        if replace:
+            return [population[rng.randrange(len(population))] for _ in range(size)]
+        return [population[index] for index in _floyd_sample_indices(len(population), size, rng)]
+
+    urn = Urn(population=population, replace=replace, weights=weights, rng=rng)
     return list(itertools.islice(urn, size))
 
 
-def permute(population):
+def _sample_indices(n, size, replace, weights, rng):
+    """Positions of `size` samples from range(n), as an int64 array, drawn with vectorized operations."""
+    if replace and size > 0 and n == 0:
+        raise ValueError("Cannot sample with replacement from an empty population")
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+        assert weights.shape == (n,)
+        assert np.all(weights >= 0)
+        if not replace:
+            return _weighted_sample_indices(weights, size, rng).astype(np.int64)
+
+        if size == 0:
+            return np.array([], dtype=np.int64)
+        nonzero = np.flatnonzero(weights)
+        if len(nonzero) == 0:
+            raise ValueError("Cannot sample with replacement when every weight is zero")
+        cumulative_weights = np.cumsum(weights)
+        picks = rng.random_array(size) * cumulative_weights[-1]
+        # Searching to the right never returns a position with zero weight, and rounding
+        # errors never go past the last position with a positive weight
+        indices = np.searchsorted(cumulative_weights, picks, side="right")
+        return np.minimum(indices, nonzero[-1]).astype(np.int64)
+
+    if replace:
+        return np.minimum((rng.random_array(size) * n).astype(np.int64), n - 1)
+    if 16 * size < n:
+        return np.array(_floyd_sample_indices(n, size, rng), dtype=np.int64)
+    # Uniform keys, of which the smallest are a uniformly random subset in random order
+    return _weighted_sample_indices(np.ones(n), size, rng).astype(np.int64)
+
+
+def _sample_counts(n, size, replace, weights, rng):
+    """The number of times every position of range(n) is drawn, as an int64 array."""
+    if not replace:
+        return np.bincount(_sample_indices(n, size, replace, weights, rng), minlength=n).astype(np.int64)
+    if size > 0 and n == 0:
+        raise ValueError("Cannot sample with replacement from an empty population")
+    if weights is None:
+        return _multinomial(np.ones(n), size, rng)
+    weights = np.asarray(weights, dtype=float)
+    assert weights.shape == (n,)
+    assert np.all(weights >= 0)
+    return _multinomial(weights, size, rng)
+
+
+def _floyd_sample_indices(n, size, rng):
+    """Floyd's algorithm for `size` distinct indices in range(n), in random order."""
+    size = min(size, n)
+    selected = set()
+    indices = []
+    for j in range(n - size, n):
+        index = rng.randrange(j + 1)
+        if index in selected:
+            index = j
+        selected.add(index)
+        indices.append(index)
+
+    # Floyd's algorithm gives a uniformly random subset, but not in a uniformly random order
+    rng.shuffle(indices)
+    return indices
+
+
+def permute(population, rng=None):
     """Randomly permute the population."""
-    return list(Urn(population=population, replace=False, weights=None))
+    if isinstance(population, range):
+        # Urns leave ranges uncopied, which is slower when drawing every element
+        population = list(population)
+    return list(Urn(population=population, replace=False, weights=None, rng=rng))
@@ -0,0 +1,205 @@
+"""
+Benchmarks of the urns, sample(), permute() and the cumulative sum structures,
+against NumPy baselines.
+
+Every benchmark is run for a grid of population sizes N and numbers of draws k.
+Inputs are prepared outside of the timed region, timings use time.perf_counter
+after warmup runs, and the median over several repeats is reported. The results
+are written as JSON, and may be compared with the results of an earlier run.
+From the root of the repository, with the package installed or on the path:
+
+    python scripts/benchmark.py --output baseline.json
+    python scripts/benchmark.py --output results.json --baseline baseline.json
+
+The comparison exits with status 1 if any benchmark is slower than its baseline
+by more than the tolerance, so it can be used to catch regressions.
+"""
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from sampling import Urn, sample
+from sampling.cumsum import CumulativeSum
+from sampling.fenwick import FenwickTree
+from sampling.tree import CumulativeSumTree
+from sampling.utils import permute
+
+URNS = {
+    "urn-unweighted-finite": (False, False),
+    "urn-unweighted-infinite": (True, False),
+    "urn-weighted-finite": (False, True),
+    "urn-weighted-infinite": (True, True),
+}
+STRUCTURES = {"cumsum": CumulativeSum, "tree": CumulativeSumTree, "fenwick": FenwickTree}
+
+
+def _inputs(N):
+    generator = random.Random(N)
+    return [generator.random() for _ in range(N)], [generator.random() + 0.01 for _ in range(N)]
+
+
+def benchmarks(N, k):
+    """Yield (name, setup, run) for every benchmark with N elements and k draws.
+
+    The timed function `run` is called on the result of `setup`, which is not timed.
+    """
+    population, weights = _inputs(N)
+    weights_array = np.array(weights)
+
+    for name, (replace, weighted) in URNS.items():
+        urn_weights = weights if weighted else None
+
+        def build(replace=replace, urn_weights=urn_weights):
+            return Urn(population, replace=replace, weights=urn_weights)
+
+        yield f"{name}-build", lambda: None, lambda _, build=build: build()
+        yield f"{name}-draw", build, lambda urn: urn.draw(k)
+        yield f"{name}-next", build, lambda urn: list(itertools.islice(urn, k))
+
+    for replace, weighted in itertools.product((False, True), repeat=2):
+        suffix = f"{'with' if replace else 'without'}-replacement{'-weighted' if weighted else ''}"
+        sample_weights = weights if weighted else None
+        probabilities = weights_array / weights_array.sum() if weighted else None
+
+        yield (
+            f"sample-{suffix}",
+            lambda: None,
+            lambda _, replace=replace, w=sample_weights: sample(population, k, replace=replace, weights=w),
+        )
+        # NumPy draws indices, and the elements are gathered into a list as sample() returns
+        yield (
+            f"numpy-choice-{suffix}",
+            lambda: None,
+            lambda _, replace=replace, p=probabilities: [
+                population[i] for i in np.random.choice(N, k, replace=replace, p=p).tolist()
+            ],
+        )
+
+    for name, structure in STRUCTURES.items():
+        indices = np.random.randint(N, size=k)
+        search_weights = np.random.random(k) * weights_array.sum()
+
+        yield f"{name}-build", lambda: None, lambda _, structure=structure: structure(weights_array)
+        yield (
+            f"{name}-query",
+            lambda s=structure: s(weights_array),
+            lambda s, search_weights=search_weights: s.query_many(search_weights),
+        )
+        yield (
+            f"{name}-update",
+            lambda s=structure: s(weights_array),
+            lambda s, indices=indices: [s.update_weight(i, 1.0) for i in indices.tolist()],
+        )
+
+
+def permutation_benchmarks(N):
+    population, _ = _inputs(N)
+    yield "permute", lambda: None, lambda _: permute(population)
+    yield "numpy-permutation", lambda: None, lambda _: [population[i] for i in np.random.permutation(N).tolist()]
+
+
+def measure(setup, run, repeat=5, warmup=1, min_time=0.02):
+    """Time `run(setup())`, returning the median and minimum seconds per call over `repeat` samples.
+
+    Every sample calls `run` until at least `min_time` seconds have been spent in it,
+    so that calls much shorter than the resolution of the clock are still measured.
+    """
+    for _ in range(warmup):
+        run(setup())
+
+    samples = []
+    for _ in range(repeat):
+        elapsed, calls = 0.0, 0
+        while calls == 0 or elapsed < min_time:
+            state = setup()
+            start = time.perf_counter()
+            run(state)
+            elapsed += time.perf_counter() - start
+            calls += 1
+        samples.append(elapsed / calls)
+    return {"median": statistics.median(samples), "min": min(samples)}
+
+
+def run_benchmarks(sizes, draws, repeat=5, warmup=1, min_time=0.02, pattern=""):
+    results = []
+
+    def record(name, N, k, setup, run):
+        if pattern in name:
+            result = measure(setup, run, repeat=repeat, warmup=warmup, min_time=min_time)
+            results.append({"name": name, "N": N, "k": k, **result})
+            print(f"{name:<48} N={N:<9} k={k:<9} {result['median'] * 1e6:12.1f} us", flush=True)
+
+    for N in sizes:
+        # Without replacement, at most N elements can be drawn
+        for k in [k for k in draws if k <= N]:
+            for name, setup, run in benchmarks(N, k):
+                record(name, N, k, setup, run)
+        for name, setup, run in permutation_benchmarks(N):
+            record(name, N, N, setup, run)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return the results slower than their baseline by more than the factor 1 + tolerance."""
+    baseline = {(result["name"], result["N"], result["k"]): result for result in baseline["results"]}
+    regressions = []
+    for result in results:
+        reference = baseline.get((result["name"], result["N"], result["k"]))
+        if reference is None:
+            continue
+        ratio = result["median"] / reference["median"]
+        if ratio > 1 + tolerance:
+            regressions.append({**result, "baseline": reference["median"], "ratio": ratio})
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 3, 10 ** 4, 10 ** 5], help="values of N")
+    parser.add_argument("--draws", type=int, nargs="+", default=[1, 10, 100, 1000], help="values of k")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed samples per benchmark")
+    parser.add_argument("--warmup", type=int, default=1, help="number of untimed runs per benchmark")
+    parser.add_argument("--min-time", type=float, default=0.02, help="minimum seconds per timed sample")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this string")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 0.25)")
+    args = parser.parse_args(arguments)
+
+    results = run_benchmarks(
+        args.sizes, args.draws, repeat=args.repeat, warmup=args.warmup, min_time=args.min_time, pattern=args.filter
+    )
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['name']} N={regression['N']} k={regression['k']}: "
+                f"{regression['ratio']:.2f}x slower than the baseline"
+            )
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())